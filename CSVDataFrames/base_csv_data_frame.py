@@ -4,10 +4,14 @@ from typing import List
 import numpy as np
 import pandas as pd
 from models.db_session import DBSession
+from models.db_writer import DBWriter
+from models.title_dedup_index import TitleDedupIndex
 from time import time
 
 
 class BaseCSVDataFrame:
+    # Columns of the csv read as strings by the streaming import, whatever the values of a chunk look like.
+    STRING_COLUMNS = []
 
     def __init__(self, data: pd.DataFrame = None):
         self.data = data
@@ -69,6 +73,103 @@ class BaseCSVDataFrame:
         session.logger.info(output_info)
         return insert_count
 
+    def insert_csv(self, path: str, session: DBSession, chunksize: int = 10000, limit: int = None,
+                   db_writer: DBWriter = None, **read_csv_kwargs) -> int:
+        """
+        Streams a csv to the project DB: the file is read by chunks, each chunk is normalized as a whole, deduplicated
+        against the titles of the previous chunks and inserted with a bulk insertion, so that the file is never loaded
+        entirely in memory.
+
+        :param path: The path of the csv.
+        :param session: The DB session, used when there is no DB writer.
+        :param chunksize: The number of rows read, normalized and inserted at once.
+        :param limit: The limit in the number of rows to insert.
+        :param db_writer: The writer of the DB, the chunks are inserted with the session if None.
+        :param read_csv_kwargs: The parameters of `pd.read_csv` (separator, encoding...).
+        :return: The number of rows actually inserted.
+        """
+        start = time()
+        # Hashes of the normalized titles of the file, only the first occurrence of a title is inserted.
+        titles = TitleDedupIndex(near_matches=False)
+        read_count, insert_count, duplicate_count = 0, 0, 0
+        # The types inferred by pandas may change from a chunk to another (e.g. a chunk of years only is read as ints).
+        read_csv_kwargs['dtype'] = {
+            **{column: str for column in self.STRING_COLUMNS},
+            **(read_csv_kwargs.get('dtype') or {})
+        }
+        for chunk in pd.read_csv(path, chunksize=chunksize, nrows=limit, **read_csv_kwargs):
+            self.data = chunk
+            self.data_integrity_check()
+            read_count += len(chunk)
+            records = []
+            for record in self.normalize_chunk():
+                if titles.find(record['title']) is not None:
+                    duplicate_count += 1
+                    continue
+                titles.add(paper_id=len(titles), title=record['title'])
+                records.append(record)
+            if db_writer is not None:
+                statuses = db_writer.write(records).result()
+            else:
+                statuses = session.insert_papers_bulk(contents=records)
+                session.session.commit()
+            inserted = sum(int(added) for added, _ in statuses)
+            insert_count += inserted
+            duplicate_count += len(statuses) - inserted
+            session.logger.info(f'{read_count} rows read, {insert_count} inserted ({round(time() - start, 2)}s).')
+        session.logger.info(
+            f'{insert_count} rows were actually inserted, {duplicate_count} were duplicates or already in the DB.\n'
+            f'Elapsed : {round(time() - start, 2)}s'
+        )
+        return insert_count
+
+    def normalize_chunk(self) -> List[dict]:
+        """
+        Converts the rows of the DataFrame (a chunk of a csv) to the contents of papers accepted by
+        `DBSession.insert_papers_bulk`, with column-wise operations.
+
+        :return: The contents of the papers.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support the streaming import.')
+
+    @staticmethod
+    def column_to_lists(column: pd.Series, separator: str) -> pd.Series:
+        """
+        Splits a column of delimited strings (e.g. the authors of the papers) in lists of stripped, non-empty values.
+
+        :param column: The column.
+        :param separator: The delimiter of the values.
+        :return: The column of lists, empty where the value was missing.
+        """
+        lists = column.astype('string').str.split(separator)
+        return lists.map(lambda values: [value.strip() for value in values if value.strip()]
+                         if isinstance(values, list) else [])
+
+    @staticmethod
+    def column_to_dates(column: pd.Series) -> pd.Series:
+        """
+        Parses a column of dates read as strings, in any format recognized by pandas. A year alone is the first day of
+        the year.
+
+        :param column: The column.
+        :return: The column of dates, NaT where the value is missing or cannot be parsed.
+        """
+        column = column.astype('string').str.strip()
+        years = column.str.fullmatch(r'\d{4}').fillna(False).astype(bool)
+        dates = pd.to_datetime(column.where(~years), format='mixed', errors='coerce')
+        dates[years] = pd.to_datetime(column[years], format='%Y')
+        return dates.dt.date
+
+    @staticmethod
+    def column_to_none(column: pd.Series) -> pd.Series:
+        """
+        Transforms the NaN and NaT values of a column to None.
+
+        :param column: The column.
+        :return: The column, of object type.
+        """
+        return column.astype(object).where(column.notna(), None)
+
     @abstractmethod
     def insert_to_db(self, row: pd.Series, session: DBSession) -> None:
         """
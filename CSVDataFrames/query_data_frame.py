@@ -1,3 +1,5 @@
+from typing import List
+
 from CSVDataFrames.base_csv_data_frame import BaseCSVDataFrame
 import pandas as pd
 from models.db_session import DBSession
@@ -8,10 +10,20 @@ class QueryDataFrame(BaseCSVDataFrame):
     REQUIRED_COLUMNS = [
         "title", "authors", "date", "abstract", "source", "DOI", "url", "query",
     ]
-
-    def __init__(self, data: pd.DataFrame = None, database: str = ''):
+    # Columns of the csv -> fields of the contents of the papers, for the streaming import.
+    COLUMN_MAPPING = {
+        'date': 'publication_date',
+        'DOI': 'doi',
+        'query': 'search_string',
+    }
+    STRING_COLUMNS = ['date']
+    # Columns holding delimited lists of values.
+    LIST_COLUMNS = ['authors', 'tags', 'un_goals']
+
+    def __init__(self, data: pd.DataFrame = None, database: str = '', list_separator: str = ','):
         super().__init__(data=data)
         self.database_name = database
+        self.list_separator = list_separator
 
     @property
     def database_name(self) -> str:
@@ -24,6 +36,20 @@ class QueryDataFrame(BaseCSVDataFrame):
     def insert_to_db(self, row: pd.Series, session: DBSession):
         return session.insert_to_papers_db(content=self.row_to_dict(row))
 
+    def normalize_chunk(self) -> List[dict]:
+        data = self.data.rename(columns=QueryDataFrame.COLUMN_MAPPING)
+        data['title'] = data['title'].astype('string').str.strip()
+        data = data[data['title'].fillna('') != '']
+        data['publication_date'] = BaseCSVDataFrame.column_to_dates(data['publication_date'])
+        for column in data.columns:
+            if column in QueryDataFrame.LIST_COLUMNS:
+                data[column] = BaseCSVDataFrame.column_to_lists(data[column], separator=self.list_separator)
+            else:
+                data[column] = BaseCSVDataFrame.column_to_none(data[column])
+        data['search_string'] = data['search_string'].map(lambda name: {'name': name})
+        data['database'] = self.database_name
+        return data.to_dict(orient='records')
+
     def row_to_dict(self, row: pd.Series) -> dict:
         return {
             **row.to_dict(),
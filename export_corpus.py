@@ -0,0 +1,20 @@
+import argparse
+
+import models.base as base
+from models.corpus_export import CorpusExport
+from spiders_config import CONFIG
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Exports the papers of the DB with their source, authors, tags, UN goals, databases and search '
+                    'strings, by chunks.'
+    )
+    parser.add_argument('path', help='Path of the export, its extension gives the format (csv, jsonl or parquet).')
+    parser.add_argument('--format', choices=CorpusExport.FORMATS, default=None, help='Format of the export.')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Number of papers read at once.')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of papers to export.')
+    args = parser.parse_args()
+    base.configure(**CONFIG.get('database', {}))
+    session = base.get_session()
+    CorpusExport(session=session, chunk_size=args.chunk_size).write(path=args.path, format=args.format, limit=args.limit)
+    session.close()
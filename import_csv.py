@@ -0,0 +1,26 @@
+import argparse
+
+import models.base as base
+from CSVDataFrames.query_data_frame import QueryDataFrame
+from models.db_session import DBSession
+from spiders_config import CONFIG
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Imports a csv export of a registry to the DB, by chunks.')
+    parser.add_argument('path', help='Path of the csv.')
+    parser.add_argument('--database', required=True, help='Name of the registry the csv was exported from.')
+    parser.add_argument('--chunksize', type=int, default=10000, help='Number of rows inserted at once.')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of rows to import.')
+    parser.add_argument('--separator', default=',', help='Delimiter of the csv.')
+    parser.add_argument('--list-separator', default=',', help='Delimiter of the authors and tags of a paper.')
+    args = parser.parse_args()
+    base.configure(**CONFIG.get('database', {}))
+    session = DBSession(base.get_session())
+    QueryDataFrame(database=args.database, list_separator=args.list_separator).insert_csv(
+        path=args.path,
+        session=session,
+        chunksize=args.chunksize,
+        limit=args.limit,
+        sep=args.separator
+    )
+    session.session.close()
@@ -1,11 +1,162 @@
-from sqlalchemy import create_engine
+import os
+from threading import Lock
+
+from logzero import logger
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 
 Base = declarative_base()
 
-engine = create_engine('sqlite:///papers.db')
-_SessionFactory = sessionmaker(bind=engine)
+# Storage profiles: the pragmas run on every new SQLite connection.
+PROFILES = {
+    'default': {},
+    # Concurrent readers (e.g. analysts querying the DB) with a single writer (the crawl): with the write-ahead log,
+    # readers do not block the writer and the writer does not block readers.
+    'tuned_sqlite': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    }
+}
+
+engine = None
+_SessionFactory = sessionmaker()
+_settings = {}
+# Id of the process in which the engine was created.
+_engine_pid = None
+# Id of the process in which the schema was created, it is created once per process.
+_schema_pid = None
+# The threads of a process (e.g. the DB writer and the spiders) may get their first session at the same time.
+_schema_lock = Lock()
+
+
+def configure(url: str = 'sqlite:///papers.db', profile: str = 'default', pool_size: int = 5,
+              max_overflow: int = 10, echo: bool = False) -> Engine:
+    """
+    Configures the storage backend, the sessions created afterwards are bound to the new engine.
+
+    :param url: The URL of the database.
+    :param profile: The name of the storage profile, see `PROFILES`. The pragmas only apply to SQLite.
+    :param pool_size: The number of connections kept open.
+    :param max_overflow: The number of connections opened on top of the pool when all of them are in use.
+    :param echo: Should the SQL statements be logged?
+    :return: The engine.
+    """
+    global engine, _settings, _schema_pid, _engine_pid
+    if profile not in PROFILES:
+        raise KeyError(f'Unknown storage profile {profile}, available profiles : {list(PROFILES)}.')
+    if engine is not None:
+        dispose_engine()
+    kwargs = {'echo': echo}
+    is_sqlite = url.startswith('sqlite')
+    if is_sqlite and url.rstrip('/') in ('sqlite:', 'sqlite:/:memory:', 'sqlite:///:memory:'):
+        # An in-memory database only lives as long as its single connection.
+        kwargs.update(poolclass=StaticPool, connect_args={'check_same_thread': False})
+    elif is_sqlite:
+        # The connections are shared by the threads of the crawl (e.g. the writer of the pipeline).
+        kwargs.update(
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            connect_args={'check_same_thread': False, 'timeout': 30}
+        )
+    else:
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+    engine = create_engine(url, **kwargs)
+    pragmas = PROFILES[profile]
+    if is_sqlite and pragmas:
+        event.listen(engine, 'connect', lambda connection, _: set_pragmas(connection, pragmas))
+    _SessionFactory.configure(bind=engine)
+    _settings = {'url': url, 'profile': profile, 'pool_size': pool_size, 'max_overflow': max_overflow, 'echo': echo}
+    _schema_pid = None
+    _engine_pid = os.getpid()
+    return engine
+
+
+def dispose_engine() -> None:
+    """
+    Closes the connections of the pool of the engine. In a forked process, the connections inherited from the parent
+    are only dropped, closing them would disturb the parent.
+    """
+    if os.getpid() == _engine_pid:
+        engine.dispose()
+        return
+    try:
+        engine.dispose(close=False)
+    except TypeError:
+        # SQLAlchemy < 1.4.33.
+        engine.dispose()
+
+
+def set_pragmas(connection, pragmas: dict) -> None:
+    """
+    Runs pragmas on a new SQLite connection.
+
+    :param connection: The DBAPI connection.
+    :param pragmas: The values of the pragmas, by name.
+    """
+    cursor = connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def get_settings() -> dict:
+    """
+    Returns the parameters of the current configuration, to configure a worker process identically.
+
+    :return: The parameters of `configure`.
+    """
+    return dict(_settings)
+
+
+def get_engine() -> Engine:
+    """
+    Returns the engine, the default configuration is used if the backend was not configured.
+
+    :return: The engine.
+    """
+    if engine is None:
+        configure()
+    return engine
+
+
+def create_schema() -> None:
+    """
+    Creates the tables, indexes and full-text index missing from the database, once per process. The corpus statistics
+    of a new CorpusStat table are computed from the papers already in the database.
+    """
+    global _schema_pid
+    get_engine()
+    pid = os.getpid()
+    if _schema_pid == pid:
+        return
+    with _schema_lock:
+        if _schema_pid == pid:
+            return
+        if _engine_pid != pid:
+            # Forked process: the connections inherited from the parent must not be used.
+            dispose_engine()
+        # All the models must be declared for the foreign keys to be resolved.
+        import models.db_session  # noqa: F401
+        from models.paper_search import create_fts_index
+        from models.corpus_stats import CorpusStats
+        new_stats_table = CorpusStats.TABLE not in inspect(engine).get_table_names()
+        Base.metadata.create_all(engine)
+        add_missing_columns()
+        create_indexes()
+        create_fts_index(engine)
+        if new_stats_table:
+            # The counts are then only incremented, those of the papers already in the database must be filled.
+            CorpusStats.fill(session=_SessionFactory())
+        _schema_pid = pid
 
 
 def get_session():
@@ -14,9 +165,39 @@ def get_session():
 
     :return: The session object.
     """
-    Base.metadata.create_all(engine)
+    create_schema()
     return _SessionFactory()
 
 
+def add_missing_columns():
+    """
+    Adds the nullable columns declared after their table was created, `create_all` only creates new tables.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable or column.primary_key:
+                    continue
+                logger.info(f'Adding the column {column.name} to the table {table.name}.')
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def create_indexes():
+    """
+    Creates the indexes missing from tables created before they were declared, `create_all` only creates the indexes
+    of new tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except (IntegrityError, OperationalError) as e:
+                # A unique index cannot be created on a column holding duplicates.
+                logger.warning(f'Could not create the index {index.name}: {e.orig}')
+
+
 def get_tables():
     return Base.metadata.tables
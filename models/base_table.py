@@ -4,6 +4,7 @@ from sqlalchemy.exc import StatementError
 from sqlalchemy.orm import Session
 import pandas as pd
 from sqlalchemy import inspect
+from sqlalchemy.dialects import sqlite, postgresql, mysql
 from sqlalchemy.sql.expression import desc
 
 
@@ -34,7 +35,7 @@ class BaseTable:
         :param kwargs: The search arguments.
         :return: True if at least one row is found, False otherwise.
         """
-        return session.query(cls).filter_by(**kwargs).count() > 0
+        return session.query(session.query(cls).filter_by(**kwargs).exists()).scalar()
 
     @classmethod
     def to_dataframe(cls, session: Session, **kwargs):
@@ -76,6 +77,51 @@ class BaseTable:
                 session.flush()
             return obj
 
+    @classmethod
+    def upsert(cls, session: Session, rows: List[dict], index_elements: List[str], update_columns: List[str] = None,
+               increment_columns: List[str] = None):
+        """
+        Inserts rows with a native upsert (`INSERT ... ON CONFLICT` or `ON DUPLICATE KEY UPDATE`) in a single
+        statement executed for all the rows.
+
+        :param session: The database session.
+        :param rows: The rows to insert, they must all have the same keys.
+        :param index_elements: The columns of the unique index (or primary key) identifying a row.
+        :param update_columns: The columns updated when the row already exists, None to leave the existing row as is.
+        :param increment_columns: The columns to which the inserted value is added when the row already exists (e.g.
+        counters).
+        """
+        if not rows:
+            return
+        dialect = session.get_bind().dialect.name
+        update_columns = update_columns or []
+        increment_columns = increment_columns or []
+        if dialect == 'mysql':
+            statement = mysql.insert(cls.__table__)
+            values = {column: getattr(statement.inserted, column) for column in update_columns}
+            values.update({
+                column: getattr(cls.__table__.c, column) + getattr(statement.inserted, column)
+                for column in increment_columns
+            })
+            # A no-op update on the key when the existing row should be left as is.
+            statement = statement.on_duplicate_key_update(**(values or {
+                index_elements[0]: getattr(statement.inserted, index_elements[0])
+            }))
+        elif dialect in ('sqlite', 'postgresql'):
+            statement = (sqlite if dialect == 'sqlite' else postgresql).insert(cls.__table__)
+            if update_columns or increment_columns:
+                values = {column: getattr(statement.excluded, column) for column in update_columns}
+                values.update({
+                    column: getattr(cls.__table__.c, column) + getattr(statement.excluded, column)
+                    for column in increment_columns
+                })
+                statement = statement.on_conflict_do_update(index_elements=index_elements, set_=values)
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+        else:
+            raise NotImplementedError(f'Upserts are not supported for the {dialect} dialect.')
+        session.execute(statement, rows)
+
     @classmethod
     def get_attributes(cls, remove_id=True):
         """
@@ -0,0 +1,195 @@
+import json
+import os
+from typing import Iterator
+
+import pandas as pd
+from logzero import logger
+from sqlalchemy import func, select, literal
+from sqlalchemy.orm import Session
+
+from models.db_session import DBSession
+from models.papers.paper import Paper
+from models.papers.source import Source
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Separator of the names aggregated by the database, split back into lists.
+_SEPARATOR = '\x1f'
+
+
+class CorpusExport:
+    """
+    Denormalized view of the papers of the DB: one row per paper with its source and the lists of its authors, tags,
+    UN goals, databases and search strings.
+
+    The view is read with a single aggregated query per chunk (the relations are aggregated by correlated subqueries,
+    served by the primary keys of the relation tables), the chunks are paginated on the id of the papers so that the
+    memory used does not depend on the size of the corpus.
+    """
+
+    PAPER_COLUMNS = [
+        'id', 'title', 'publication_date', 'pub_type', 'content_type', 'abstract', 'doi', 'url', 'page_url',
+        'citation_count', 'citation_count_updated_at', 'citation_velocity'
+    ]
+    # List columns of the view -> key of the relation in `DBSession.BULK_RELATIONS`.
+    LIST_COLUMNS = {
+        'authors': 'authors',
+        'tags': 'tags',
+        'un_goals': 'un_goals',
+        'databases': 'database',
+        'search_strings': 'search_string',
+    }
+    FORMATS = ['csv', 'jsonl', 'parquet']
+
+    def __init__(self, session: Session, chunk_size: int = 10000):
+        """
+        Constructor of the CorpusExport class.
+
+        :param session: The database session.
+        :param chunk_size: The number of papers read at once.
+        """
+        self.session = session
+        self.chunk_size = chunk_size
+
+    def aggregate(self, column):
+        """
+        Returns the aggregation of the values of a column in a single string, in the dialect of the database.
+
+        :param column: The column.
+        :return: The aggregate expression.
+        """
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return func.string_agg(column, literal(_SEPARATOR))
+        if dialect == 'mysql':
+            return func.group_concat(column.op('SEPARATOR')(literal(_SEPARATOR)))
+        return func.group_concat(column, _SEPARATOR)
+
+    def query(self, after_id: int = 0):
+        """
+        Builds the query of a chunk of the view.
+
+        :param after_id: The id after which the papers of the chunk start.
+        :return: The select statement.
+        """
+        columns = [getattr(Paper, column).label(column) for column in CorpusExport.PAPER_COLUMNS]
+        columns.append(Source.name.label('source'))
+        for name, key in CorpusExport.LIST_COLUMNS.items():
+            child, relation, column = DBSession.BULK_RELATIONS[key]
+            columns.append(
+                select(self.aggregate(child.name))
+                .select_from(relation.__table__.join(child.__table__, getattr(relation, column) == child.id))
+                .where(relation.paper_id == Paper.id)
+                .scalar_subquery()
+                .label(name)
+            )
+        return (
+            select(*columns)
+            .select_from(Paper.__table__.outerjoin(Source.__table__, Paper.source_id == Source.id))
+            .where(Paper.id > after_id)
+            .order_by(Paper.id)
+            .limit(self.chunk_size)
+        )
+
+    def iter_chunks(self, limit: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Iterates over the view by chunks.
+
+        :param limit: The maximum number of papers to read.
+        :return: The chunks, as DataFrames whose list columns hold lists.
+        """
+        after_id, count = 0, 0
+        while limit is None or count < limit:
+            rows = self.session.execute(self.query(after_id=after_id)).fetchall()
+            if not rows:
+                break
+            if limit is not None:
+                rows = rows[:limit - count]
+            df = pd.DataFrame(rows, columns=list(rows[0]._fields))
+            for name in CorpusExport.LIST_COLUMNS:
+                df[name] = df[name].map(lambda value: value.split(_SEPARATOR) if isinstance(value, str) else [])
+            yield df
+            after_id = int(rows[-1].id)
+            count += len(rows)
+
+    def to_dataframe(self, limit: int = None) -> pd.DataFrame:
+        """
+        Reads the view in a single DataFrame.
+
+        :param limit: The maximum number of papers to read.
+        :return: The papers.
+        """
+        chunks = list(self.iter_chunks(limit=limit))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    @staticmethod
+    def arrow_schema():
+        """
+        Returns the Arrow schema of the view, a chunk could not be relied on to infer it (e.g. a column only holding
+        nulls).
+        """
+        return pa.schema([
+            ('id', pa.int64()),
+            ('title', pa.string()),
+            ('publication_date', pa.date32()),
+            ('pub_type', pa.string()),
+            ('content_type', pa.string()),
+            ('abstract', pa.string()),
+            ('doi', pa.string()),
+            ('url', pa.string()),
+            ('page_url', pa.string()),
+            ('citation_count', pa.int64()),
+            ('citation_count_updated_at', pa.timestamp('us')),
+            ('citation_velocity', pa.float64()),
+            ('source', pa.string()),
+            *[(name, pa.list_(pa.string())) for name in CorpusExport.LIST_COLUMNS],
+        ])
+
+    def write(self, path: str, format: str = None, limit: int = None, list_separator: str = ';',
+              compression: str = 'zstd') -> int:
+        """
+        Writes the view to a file, chunk by chunk.
+
+        :param path: The path of the file.
+        :param format: 'csv', 'jsonl' or 'parquet', guessed from the extension of the path if None.
+        :param limit: The maximum number of papers to write.
+        :param list_separator: The separator of the values of the list columns in a csv.
+        :param compression: The compression codec of a Parquet file.
+        :return: The number of papers written.
+        """
+        format = format or os.path.splitext(path)[1].lstrip('.')
+        if format not in CorpusExport.FORMATS:
+            raise ValueError(f'Unknown export format {format}, available formats : {CorpusExport.FORMATS}.')
+        if format == 'parquet' and pa is None:
+            raise ImportError('pyarrow is required to export to parquet, install it or use the csv or jsonl format.')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        count = 0
+        writer = None
+        try:
+            for df in self.iter_chunks(limit=limit):
+                if format == 'parquet':
+                    schema = CorpusExport.arrow_schema()
+                    writer = writer or pq.ParquetWriter(path, schema=schema, compression=compression)
+                    writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                elif format == 'jsonl':
+                    with open(path, 'w' if count == 0 else 'a', encoding='utf-8') as file:
+                        # NaN is not valid JSON.
+                        for record in df.astype(object).where(df.notna(), None).to_dict(orient='records'):
+                            file.write(json.dumps(record, default=str) + '\n')
+                else:
+                    for name in CorpusExport.LIST_COLUMNS:
+                        df[name] = df[name].map(list_separator.join)
+                    df.to_csv(path_or_buf=path, mode='w' if count == 0 else 'a', header=count == 0, index=False)
+                count += len(df)
+                logger.info(f'{count} paper(s) exported to {path}.')
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
@@ -0,0 +1,174 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+from logzero import logger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.papers.author import PaperAuthor
+from models.papers.author_writes_paper import AuthorWritesPaper
+from models.papers.corpus_stat import CorpusStat
+from models.papers.paper import Paper
+from models.papers.paper_has_searchstring import PaperHasSearchString
+from models.papers.paper_has_tag import PaperHasTag
+from models.papers.paper_has_un_goal import PaperHasUNGoal
+from models.papers.paper_is_in_db import PaperIsInDB
+from models.papers.paper_tag import PaperTag
+from models.papers.researchdb import ResearchDB
+from models.papers.searchstring import SearchString
+from models.papers.source import Source
+from models.papers.un_goal import UNGoal
+
+
+class CorpusStats:
+    """
+    Number of papers per author, tag, UN goal, database, search string and source, and per keyword and keyword column
+    of the search strings (the number of papers returned by the search strings using them), stored in the CorpusStat
+    table.
+
+    The counts are incremented in the transaction of the insertion of the papers, so that dashboards read them instead
+    of aggregating the relation tables. `rebuild` recomputes them from scratch.
+    """
+
+    TABLE = CorpusStat.__tablename__
+    # Dimension -> (child table, relation table, column of the child in the relation table).
+    RELATIONS = {
+        'author': (PaperAuthor, AuthorWritesPaper, 'author_id'),
+        'tag': (PaperTag, PaperHasTag, 'tag_id'),
+        'un_goal': (UNGoal, PaperHasUNGoal, 'un_goal_id'),
+        'database': (ResearchDB, PaperIsInDB, 'db_id'),
+        'search_string': (SearchString, PaperHasSearchString, 'search_string_id'),
+    }
+    # A keyword of a search string and its column in the keyword file, as formatted by `MAQuery.__str__`.
+    KEYWORD_PATTERN = re.compile(r'(.*?) \(([^()]*)\)(?:, |$)')
+
+    @staticmethod
+    def keywords(search_string: str) -> List[Tuple[str, str]]:
+        """
+        Parses the keywords of a search string.
+
+        :param search_string: The name of the search string.
+        :return: The (keyword, column) pairs, the column being None for the search strings not generated from the
+        keyword file.
+        """
+        return [
+            (keyword.strip(), column.strip() if column.strip() != 'None' else None)
+            for keyword, column in CorpusStats.KEYWORD_PATTERN.findall(search_string or '')
+        ]
+
+    @staticmethod
+    def search_string_deltas(search_string: str) -> Counter:
+        """
+        Returns the increments of the counts when a paper is linked to a search string.
+
+        :param search_string: The name of the search string.
+        :return: The increments, by (dimension, name).
+        """
+        deltas = Counter({('search_string', search_string): 1})
+        for keyword, column in CorpusStats.keywords(search_string):
+            deltas[('keyword', keyword)] += 1
+            if column:
+                deltas[('keyword_column', column)] += 1
+        return deltas
+
+    @staticmethod
+    def paper_deltas(names: Dict[str, Iterable[str]]) -> Counter:
+        """
+        Returns the increments of the counts when a paper is inserted.
+
+        :param names: The names of the rows related to the paper, by dimension (see `RELATIONS`, and 'source').
+        :return: The increments, by (dimension, name).
+        """
+        deltas = Counter()
+        for dimension, values in names.items():
+            for name in set(values):
+                if name is None:
+                    continue
+                if dimension == 'search_string':
+                    deltas.update(CorpusStats.search_string_deltas(name))
+                else:
+                    deltas[(dimension, name)] += 1
+        return deltas
+
+    @staticmethod
+    def apply(session: Session, deltas: Counter) -> None:
+        """
+        Adds increments to the counts, in the current transaction.
+
+        :param session: The database session.
+        :param deltas: The increments, by (dimension, name).
+        """
+        CorpusStat.upsert(
+            session=session,
+            rows=[
+                {'dimension': dimension, 'name': name, 'paper_count': count}
+                for (dimension, name), count in deltas.items() if count
+            ],
+            index_elements=['dimension', 'name'],
+            increment_columns=['paper_count']
+        )
+
+    @staticmethod
+    def rebuild(session: Session) -> int:
+        """
+        Recomputes all the counts from the relation tables, with one aggregated query per dimension.
+
+        :param session: The database session.
+        :return: The number of counts.
+        """
+        counts = Counter()
+        for dimension, (child, relation, column) in CorpusStats.RELATIONS.items():
+            query = session.query(child.name, func.count(relation.paper_id)) \
+                .join(relation, getattr(relation, column) == child.id) \
+                .group_by(child.name)
+            for name, count in query:
+                if dimension == 'search_string':
+                    counts.update({key: value * count for key, value in CorpusStats.search_string_deltas(name).items()})
+                else:
+                    counts[(dimension, name)] += count
+        query = session.query(Source.name, func.count(Paper.id)).join(Paper, Paper.source_id == Source.id) \
+            .group_by(Source.name)
+        counts.update({('source', name): count for name, count in query})
+        session.query(CorpusStat).delete()
+        if counts:
+            session.execute(CorpusStat.__table__.insert(), [
+                {'dimension': dimension, 'name': name, 'paper_count': count}
+                for (dimension, name), count in counts.items()
+            ])
+        session.commit()
+        logger.info(f'Corpus statistics rebuilt: {len(counts)} count(s).')
+        return len(counts)
+
+    @staticmethod
+    def fill(session: Session) -> None:
+        """
+        Computes the counts of a new (empty) CorpusStat table when the DB already holds papers, then closes the
+        session.
+
+        :param session: The database session.
+        """
+        try:
+            if session.query(Paper.id).first() is not None:
+                logger.info('Computing the corpus statistics of the papers already in the DB.')
+                CorpusStats.rebuild(session)
+        finally:
+            session.close()
+
+    @staticmethod
+    def to_dataframe(session: Session, dimension: str, limit: int = None) -> pd.DataFrame:
+        """
+        Returns the counts of a dimension, by decreasing number of papers.
+
+        :param session: The database session.
+        :param dimension: The dimension ('author', 'tag', 'un_goal', 'database', 'search_string', 'source', 'keyword'
+        or 'keyword_column').
+        :param limit: The maximum number of rows.
+        :return: The names and their number of papers.
+        """
+        query = session.query(CorpusStat.name, CorpusStat.paper_count) \
+            .filter(CorpusStat.dimension == dimension) \
+            .order_by(CorpusStat.paper_count.desc(), CorpusStat.name) \
+            .limit(limit)
+        return pd.read_sql(query.statement, session.bind)
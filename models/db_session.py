@@ -1,4 +1,6 @@
-from typing import List, Any, Tuple, Union
+from collections import Counter
+from datetime import datetime
+from typing import List, Any, Tuple, Union, Dict, Iterable
 
 from sqlalchemy.orm import Session
 
@@ -15,19 +17,67 @@ from models.papers.paper_is_in_db import PaperIsInDB
 from models.papers.paper_has_tag import PaperHasTag
 from models.papers.paper_tag import PaperTag
 from models.papers.paper_has_un_goal import PaperHasUNGoal
+from models.title_dedup_index import TitleDedupIndex
+from models.corpus_stats import CorpusStats
 from logzero import logger
 import pprint
 
 
 class DBSession:
+    # Fields of a paper that change over time, updated when an existing paper is scraped again.
+    MUTABLE_PAPER_FIELDS = ['citation_count', 'url', 'page_url']
+    # A citation count whose 'fetched_at' (the time the content was scraped, e.g. for the pages re-parsed from an
+    # archive) is older than the last update of the count of the DB is not applied.
+    # Many to many relations of the papers, resolved by name in the bulk insertions:
+    # content key -> (child table, relation table, column of the child in the relation table).
+    BULK_RELATIONS = {
+        'authors': (PaperAuthor, AuthorWritesPaper, 'author_id'),
+        'tags': (PaperTag, PaperHasTag, 'tag_id'),
+        'un_goals': (UNGoal, PaperHasUNGoal, 'un_goal_id'),
+        'database': (ResearchDB, PaperIsInDB, 'db_id'),
+        'search_string': (SearchString, PaperHasSearchString, 'search_string_id'),
+    }
+    # Message of the papers of which only the list entry was read ('known') and that are not in the DB (yet).
+    NOT_FOUND = 'not found in the DB'
+    # Maximum number of values in an IN clause.
+    IN_CHUNK_SIZE = 500
 
-    def __init__(self, session: Session, batch_size=100):
+    def __init__(self, session: Session, batch_size=100, dedup: bool = True, dedup_threshold: float = 0.8,
+                 stats: bool = True):
+        """
+        Constructor of the DBSession class.
+
+        :param session: The database session.
+        :param batch_size: The number of papers after which the insertions of `insert_to_papers_db` are committed.
+        :param dedup: Should the near-duplicates of the titles in the DB be detected? Only the exact titles and DOIs
+        are looked up otherwise.
+        :param dedup_threshold: The minimum similarity of two titles for them to be duplicates, see `TitleDedupIndex`.
+        :param stats: Should the counts of papers of `CorpusStats` be updated by the insertions?
+        """
         self.session = session
         self.logger1 = logger
         self.logger = self.logger1
         self.batch_size = batch_size
         self.paper_batch_counter = 0
         self.transaction_batch_counter = 0
+        # name -> id of the rows of the tables resolved by name in the bulk insertions, by table.
+        self.name_ids = {}
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        # Index of the titles of the DB, loaded at the first insertion.
+        self._title_index = None
+        self.stats = stats
+        # Increments of the counts of CorpusStats, written at the end of each insertion.
+        self.stat_deltas = Counter()
+
+    @property
+    def title_index(self) -> Union[TitleDedupIndex, None]:
+        """
+        Returns the index of the titles of the DB, None if the detection of duplicates is disabled.
+        """
+        if self.dedup and self._title_index is None:
+            self._title_index = TitleDedupIndex.from_db(session=self.session, threshold=self.dedup_threshold)
+        return self._title_index
 
     @staticmethod
     def fill_missing_content(content: dict, required_attributes: list) -> dict:
@@ -45,9 +95,24 @@ class DBSession:
         return content
 
     def insert_to_papers_db(self, content: dict) -> Tuple[bool, Union[str, None]]:
-        # TODO: check with doi
-        if content.get('doi', None) and Paper.row_exists(session=self.session, title=content['doi']):
-            return False, content.get('title')
+        result = self._insert_to_papers_db(content)
+        self.flush_stats()
+        return result
+
+    def _insert_to_papers_db(self, content: dict) -> Tuple[bool, Union[str, None]]:
+        known = content.pop('known', False)
+        existing_paper = self.find_paper(
+            title=content.get('title'),
+            doi=content.get('doi'),
+            page_url=content.get('page_url')
+        )
+        if existing_paper is not None:
+            # Incremental run: the paper is kept, its mutable fields are updated and the search string is linked.
+            return self.update_paper(paper=existing_paper, content=content)
+        if known:
+            # Paper already scraped (only its entry in a list of results was read) but not in the DB.
+            self.logger.warning(f'Paper {content.get("title")} not found in the DB, it could not be updated.')
+            return False, DBSession.NOT_FOUND
         else:
             # Many to one where source is parent
             source = Source.get_object(session=self.session, name=content.get('source'))
@@ -58,6 +123,10 @@ class DBSession:
             tags = content.pop('tags', None)
             search_string_content = content.pop("search_string", None)
             un_goals = content.pop('un_goals', None)
+            fetched_at = content.pop('fetched_at', None)
+            if content.get('citation_count') is not None:
+                content['citation_count_updated_at'] = fetched_at or datetime.now()
+            content['title_hash'] = TitleDedupIndex.hash_title(content.get('title'))
             paper = Paper.get_object(self.session, restrict_search_kwargs=['title'], **content)
             # Add to DB
             search_string = SearchString.get_object(self.session, **search_string_content)
@@ -68,6 +137,18 @@ class DBSession:
             )
             paper.search_strings.append(paper_has_search_string)
             self.session.add(paper)
+            if self.title_index is not None:
+                self.session.flush()
+                self.title_index.add(paper_id=paper.id, title=paper.title, title_hash=paper.title_hash)
+            self.count_paper(content={
+                'authors': paper_authors,
+                'tags': tags,
+                'un_goals': un_goals,
+                'database': database,
+                'search_string': search_string_content,
+                'source': content.get('source')
+            })
+            self.flush_stats()
 
             paper.databases = DBSession.get_many_to_many_objects_paper(
                 elements=database,
@@ -115,6 +196,344 @@ class DBSession:
                 self.paper_batch_counter += 1
             return True, None
 
+    def find_paper(self, title: str = None, doi: str = None, page_url: str = None) -> Union[Paper, None]:
+        """
+        Looks for a paper in the DB by title, then by DOI, then by page URL, then by near-duplicate title.
+
+        :param title: The title of the paper.
+        :param doi: The DOI of the paper.
+        :param page_url: The URL of the page of the paper.
+        :return: The paper if it is in the DB, None otherwise.
+        """
+        paper = Paper.search(session=self.session, title=title) if title else None
+        if paper is None and doi:
+            paper = Paper.search(session=self.session, doi=doi)
+        if paper is None and page_url:
+            paper = Paper.search(session=self.session, page_url=page_url)
+        if paper is None and title and self.title_index is not None:
+            paper_id = self.title_index.find(title)
+            paper = self.session.query(Paper).get(paper_id) if paper_id is not None else None
+        return paper
+
+    def update_paper(self, paper: Paper, content: dict) -> Tuple[bool, Union[str, None]]:
+        """
+        Updates the mutable fields of a paper already in the DB and links the search string to it.
+
+        :param paper: The paper.
+        :param content: The content scraped for the paper.
+        :return: a tuple with False (no paper was added) and the title of the paper.
+        """
+        fetched_at = content.get('fetched_at')
+        for field in DBSession.MUTABLE_PAPER_FIELDS:
+            if field == 'citation_count':
+                if fetched_at is None or paper.citation_count_updated_at is None or \
+                        fetched_at > paper.citation_count_updated_at:
+                    DBSession.set_citation_count(paper=paper, citation_count=content.get(field), now=fetched_at)
+            elif content.get(field) is not None:
+                setattr(paper, field, content[field])
+        search_string_content = content.get('search_string')
+        if search_string_content:
+            search_string = SearchString.get_object(self.session, **search_string_content)
+            is_new_link = search_string.id is None or not PaperHasSearchString.row_exists(
+                self.session,
+                paper_id=paper.id,
+                search_string_id=search_string.id
+            )
+            paper_has_search_string = PaperHasSearchString.get_object(
+                self.session,
+                paper=paper,
+                search_string=search_string
+            )
+            if paper_has_search_string not in paper.search_strings:
+                paper.search_strings.append(paper_has_search_string)
+            if is_new_link and self.stats:
+                self.stat_deltas.update(CorpusStats.search_string_deltas(search_string.name))
+        return False, paper.title
+
+    @staticmethod
+    def set_citation_count(paper: Paper, citation_count: int, now: datetime = None) -> None:
+        """
+        Updates the citation count of a paper, along with the time of the update and the growth of the count since the
+        previous update.
+
+        :param paper: The paper.
+        :param citation_count: The new citation count, nothing is updated if None.
+        :param now: The time of the update, defaults to now.
+        """
+        if citation_count is None:
+            return
+        now = now or datetime.now()
+        paper.citation_velocity = DBSession.get_citation_velocity(
+            previous_count=paper.citation_count,
+            previous_time=paper.citation_count_updated_at,
+            citation_count=citation_count,
+            now=now
+        )
+        paper.citation_count = citation_count
+        paper.citation_count_updated_at = now
+
+    @staticmethod
+    def get_citation_velocity(previous_count: int, previous_time: datetime, citation_count: int,
+                              now: datetime) -> Union[float, None]:
+        """
+        Computes the growth of a citation count between two updates.
+
+        :param previous_count: The citation count at the previous update.
+        :param previous_time: The time of the previous update.
+        :param citation_count: The current citation count.
+        :param now: The current time.
+        :return: The number of citations per day, None if there is no previous update.
+        """
+        if previous_count is None or previous_time is None:
+            return None
+        days = max((now - previous_time).total_seconds() / 86400, 1)
+        return (citation_count - previous_count) / days
+
+    def insert_papers_bulk(self, contents: List[dict]) -> List[Tuple[bool, Union[str, None]]]:
+        """
+        Inserts a batch of papers at once: the sources, authors, tags, UN goals, databases and search strings of the
+        whole batch are resolved through in-memory name -> id maps, and the papers and their relations are written with
+        bulk inserts. The papers already in the DB (by title or DOI) are updated as in `insert_to_papers_db`.
+        The transaction is not committed.
+
+        :param contents: The contents of the papers.
+        :return: For every paper, a tuple with a boolean indicating whether the paper has been added and an eventual
+        error message, as returned by `insert_to_papers_db`.
+        """
+        try:
+            results = self._insert_papers_bulk(contents)
+            self.flush_stats()
+            return results
+        except Exception:
+            # The ids of the rows inserted in the failed transaction may not exist once it is rolled back.
+            self.name_ids = {}
+            self._title_index = None
+            self.stat_deltas = Counter()
+            raise
+
+    def _insert_papers_bulk(self, contents: List[dict]) -> List[Tuple[bool, Union[str, None]]]:
+        contents = [{**content} for content in contents]
+        existing_ids = self.find_paper_ids(
+            titles=[content.get('title') for content in contents],
+            dois=[content.get('doi') for content in contents],
+            page_urls=[content.get('page_url') for content in contents]
+        )
+        existing_papers = {
+            paper.id: paper
+            for ids in DBSession.chunks(list(set(existing_ids.values())), DBSession.IN_CHUNK_SIZE)
+            for paper in self.session.query(Paper).filter(Paper.id.in_(ids))
+        }
+        results = []
+        new_papers = {}
+        # Titles of the new papers of the batch, to detect the near-duplicates within the batch.
+        batch_index = TitleDedupIndex(threshold=self.dedup_threshold, near_matches=self.dedup)
+        # Position in the results of the papers not in the DB that may be new papers of the batch.
+        unresolved = []
+        for content in contents:
+            known = content.pop('known', False)
+            title = content.get('title')
+            paper_id = existing_ids.get(('title', title)) or existing_ids.get(('doi', content.get('doi'))) or \
+                existing_ids.get(('page_url', content.get('page_url')))
+            if paper_id is not None:
+                results.append(self.update_paper(paper=existing_papers[paper_id], content=content))
+            elif known or not title:
+                unresolved.append((len(results), content, known))
+                results.append(None)
+            elif batch_index.find(title) is not None:
+                # Same paper twice in the batch, the first one is kept with the relations of both.
+                DBSession.merge_relations(content=new_papers[batch_index.find(title)], duplicate=content)
+                results.append((False, title))
+            else:
+                new_papers[title] = content
+                batch_index.add(paper_id=title, title=title)
+                results.append((True, None))
+        # The paper of a known record may be a new paper of the batch, queued earlier in the run.
+        new_page_urls = {content['page_url']: title for title, content in new_papers.items() if content.get('page_url')}
+        for position, content, known in unresolved:
+            title = content.get('title')
+            new_title = new_page_urls.get(content.get('page_url')) or (batch_index.find(title) if title else None)
+            if new_title is not None:
+                DBSession.merge_relations(content=new_papers[new_title], duplicate=content)
+                results[position] = (False, new_title)
+            elif known:
+                # Left to the caller, the paper may be inserted by a later batch.
+                results[position] = (False, DBSession.NOT_FOUND)
+            else:
+                self.logger.warning(f'Paper {content.get("page_url")} has no title, it could not be inserted.')
+                results[position] = (False, title)
+        if new_papers:
+            self.insert_new_papers(list(new_papers.values()))
+        return results
+
+    @staticmethod
+    def merge_relations(content: dict, duplicate: dict) -> None:
+        """
+        Adds the names of the relations of a duplicate of a paper (e.g. its search string) to the content of the paper.
+
+        :param content: The content of the paper, updated with lists of names.
+        :param duplicate: The content of the duplicate.
+        """
+        for key in DBSession.BULK_RELATIONS:
+            names = DBSession.get_relation_names(content.get(key))
+            missing = [name for name in DBSession.get_relation_names(duplicate.get(key)) if name not in names]
+            if missing:
+                content[key] = names + missing
+
+    def insert_new_papers(self, contents: List[dict]) -> None:
+        """
+        Inserts papers that are not in the DB, with their relations, using bulk inserts.
+
+        :param contents: The contents of the papers, with distinct titles.
+        """
+        now = datetime.now()
+        columns = set(Paper.get_attributes())
+        source_ids = self.get_name_ids(Source, [content.get('source') for content in contents])
+        rows = []
+        for content in contents:
+            row = {key: value for key, value in content.items() if key in columns}
+            row['source_id'] = source_ids.get(content.get('source'))
+            row['title_hash'] = TitleDedupIndex.hash_title(content['title'])
+            if row.get('citation_count') is not None:
+                row['citation_count_updated_at'] = content.get('fetched_at') or now
+            rows.append(row)
+        # Every row gets the same keys, so that they are written in a single executemany.
+        keys = set().union(*rows)
+        self.session.execute(Paper.__table__.insert(), [{key: row.get(key) for key in keys} for row in rows])
+        paper_ids = {
+            title: paper_id
+            for titles in DBSession.chunks([content['title'] for content in contents], DBSession.IN_CHUNK_SIZE)
+            for paper_id, title in self.session.query(Paper.id, Paper.title).filter(Paper.title.in_(titles))
+        }
+        if self.title_index is not None:
+            for title, paper_id in paper_ids.items():
+                self.title_index.add(paper_id=paper_id, title=title)
+        for content in contents:
+            self.count_paper(content=content)
+        for key, (child, relation, column) in DBSession.BULK_RELATIONS.items():
+            names_by_paper = [
+                (paper_ids[content['title']], DBSession.get_relation_names(content.get(key)))
+                for content in contents
+            ]
+            child_ids = self.get_name_ids(child, [name for _, names in names_by_paper for name in names])
+            relation_rows = {
+                (paper_id, child_ids[name])
+                for paper_id, names in names_by_paper
+                for name in names
+            }
+            relation.upsert(
+                session=self.session,
+                rows=[{'paper_id': paper_id, column: child_id} for paper_id, child_id in relation_rows],
+                index_elements=['paper_id', column]
+            )
+
+    def count_paper(self, content: dict) -> None:
+        """
+        Records the increments of the counts of CorpusStats for a new paper.
+
+        :param content: The content of the paper, with the names of its authors, tags, UN goals, database, search
+        string and source.
+        """
+        if not self.stats:
+            return
+        source = content.get('source')
+        self.stat_deltas.update(CorpusStats.paper_deltas({
+            **{
+                dimension: DBSession.get_relation_names(content.get(key))
+                for dimension, key in [('author', 'authors'), ('tag', 'tags'), ('un_goal', 'un_goals'),
+                                       ('database', 'database'), ('search_string', 'search_string')]
+            },
+            'source': [source.name if isinstance(source, Source) else source]
+        }))
+
+    def flush_stats(self) -> None:
+        """
+        Writes the increments of the counts of CorpusStats recorded since the last flush, in the current transaction.
+        """
+        if self.stat_deltas:
+            deltas, self.stat_deltas = self.stat_deltas, Counter()
+            CorpusStats.apply(session=self.session, deltas=deltas)
+
+    @staticmethod
+    def get_relation_names(value: Any) -> List[str]:
+        """
+        Returns the names of the rows related to a paper, from the value of its content.
+
+        :param value: A name, a list of names, or a dict with a 'name' (the search string).
+        :return: The names.
+        """
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            value = value.get('name')
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        return [name for name in values if name is not None]
+
+    def get_name_ids(self, table, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Returns the ids of rows of a table identified by their name, the missing rows are created.
+        The ids are kept in memory, only the names never seen before are looked up in the DB.
+
+        :param table: The table, with an `id` and a `name` column.
+        :param names: The names.
+        :return: The id of every name.
+        """
+        name_ids = self.name_ids.setdefault(table, {})
+        missing = {name for name in names if name is not None and name not in name_ids}
+        if missing:
+            # The rows may have been created outside of the bulk insertions since the map was filled.
+            self.load_name_ids(table=table, names=missing)
+            missing = [name for name in missing if name not in name_ids]
+        if missing:
+            table.upsert(session=self.session, rows=[{'name': name} for name in missing], index_elements=['name'])
+            self.load_name_ids(table=table, names=missing)
+        return name_ids
+
+    def load_name_ids(self, table, names: Iterable[str]) -> None:
+        """
+        Loads the ids of rows of a table identified by their name in the name -> id map of the table.
+
+        :param table: The table, with an `id` and a `name` column.
+        :param names: The names.
+        """
+        name_ids = self.name_ids.setdefault(table, {})
+        for chunk in DBSession.chunks(list(names), DBSession.IN_CHUNK_SIZE):
+            for row_id, name in self.session.query(table.id, table.name).filter(table.name.in_(chunk)):
+                name_ids.setdefault(name, row_id)
+
+    def find_paper_ids(self, titles: List[str], dois: List[str],
+                       page_urls: List[str] = None) -> Dict[Tuple[str, str], int]:
+        """
+        Looks for papers in the DB by title, by DOI and by page URL, with chunked IN queries. The titles that are not in
+        the DB are then looked up in the index of near-duplicates.
+
+        :param titles: The titles.
+        :param dois: The DOIs.
+        :param page_urls: The URLs of the pages of the papers.
+        :return: The id of the papers found, by ('title', title), ('doi', doi) and ('page_url', page_url).
+        """
+        ids = {}
+        for key, column, values in [('title', Paper.title, titles), ('doi', Paper.doi, dois),
+                                    ('page_url', Paper.page_url, page_urls or [])]:
+            values = list({value for value in values if value})
+            for chunk in DBSession.chunks(values, DBSession.IN_CHUNK_SIZE):
+                for paper_id, value in self.session.query(Paper.id, column).filter(column.in_(chunk)):
+                    ids.setdefault((key, value), paper_id)
+        if self.title_index is not None:
+            near_ids = self.title_index.find_many(title for title in titles if title and ('title', title) not in ids)
+            ids.update({('title', title): paper_id for title, paper_id in near_ids.items()})
+        return ids
+
+    @staticmethod
+    def chunks(values: list, size: int) -> Iterable[list]:
+        """
+        Splits a list in chunks.
+
+        :param values: The list.
+        :param size: The size of the chunks.
+        :return: The chunks.
+        """
+        return (values[i:i + size] for i in range(0, len(values), size))
+
     @staticmethod
     def get_dict_attributes(d: dict, attr: List[str]) -> dict:
         """
@@ -0,0 +1,206 @@
+import multiprocessing
+import queue
+import time
+import traceback
+from concurrent.futures import Future
+from itertools import count
+from threading import Thread, Lock
+from typing import List, Tuple, Union, Any
+
+from logzero import logger
+
+import models.base as base
+from models.db_session import DBSession
+
+# Marks the end of the requests.
+_END = None
+
+
+class DBWriter:
+    """
+    Single writer of the papers DB, shared by all the crawlers: it owns its own DBSession, in a thread or in a separate
+    process, and is the only one to write, so that the writers never compete for the write lock of the database.
+
+    The batches of records submitted with `write` are queued and coalesced into large transactions, the status of
+    every record (inserted, or already in the DB) is reported back through a Future.
+    """
+
+    def __init__(self, mode: str = 'thread', batch_size: int = 500, flush_interval: float = 0.5,
+                 queue_size: int = 100, database: dict = None):
+        """
+        Constructor of the DBWriter class.
+
+        :param mode: 'thread' to write from a thread of the current process, 'process' from a separate process.
+        :param batch_size: The number of records after which a transaction is committed.
+        :param flush_interval: The time (in seconds) during which the submissions are gathered in a transaction.
+        :param queue_size: The maximum number of submissions waiting to be written.
+        :param database: The storage settings of the writer process (see `models.base.configure`), defaults to those
+        of the current process.
+        """
+        if mode not in ('thread', 'process'):
+            raise ValueError(f'Unknown writer mode {mode}, expected "thread" or "process".')
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.database = database
+        self._futures = {}
+        self._tickets = count()
+        self._lock = Lock()
+        self._requests = None
+        self._results = None
+        self._writer = None
+        self._collector = None
+
+    def start(self) -> 'DBWriter':
+        """
+        Starts the writer.
+
+        :return: The writer.
+        """
+        if self.mode == 'process':
+            self._requests = multiprocessing.Queue(maxsize=self.queue_size)
+            self._results = multiprocessing.Queue()
+            self._writer = multiprocessing.Process(
+                target=DBWriter.serve,
+                args=(self._requests, self._results, self.batch_size, self.flush_interval,
+                      self.database or base.get_settings()),
+                name='db-writer',
+                daemon=True
+            )
+        else:
+            self._requests = queue.Queue(maxsize=self.queue_size)
+            self._results = queue.Queue()
+            self._writer = Thread(
+                target=DBWriter.serve,
+                args=(self._requests, self._results, self.batch_size, self.flush_interval, None),
+                name='db-writer',
+                daemon=True
+            )
+        self._writer.start()
+        self._collector = Thread(target=self._collect, name='db-writer-results', daemon=True)
+        self._collector.start()
+        return self
+
+    def write(self, records: List[dict]) -> Future:
+        """
+        Submits records to be inserted, blocks while the queue of the writer is full.
+
+        :param records: The contents of the papers, as accepted by `DBSession.insert_papers_bulk`.
+        :return: A Future of the status of every record, a tuple with a boolean indicating whether the paper has been
+        added and an eventual error message.
+        """
+        future = Future()
+        if not records:
+            future.set_result([])
+            return future
+        with self._lock:
+            ticket = next(self._tickets)
+            self._futures[ticket] = future
+        self._requests.put((ticket, records))
+        return future
+
+    def close(self) -> None:
+        """
+        Waits for all the submitted records to be written, then stops the writer.
+        """
+        if self._writer is None:
+            return
+        self._requests.put(_END)
+        self._writer.join()
+        self._collector.join()
+        self._writer = None
+
+    def _collect(self) -> None:
+        """
+        Resolves the futures of the submissions with the results reported by the writer.
+        """
+        while True:
+            result = self._results.get()
+            if result is _END:
+                break
+            ticket, statuses, error = result
+            with self._lock:
+                future = self._futures.pop(ticket)
+            if error is None:
+                future.set_result(statuses)
+            else:
+                future.set_exception(RuntimeError(error))
+        # The writer stopped, the submissions that were not written will never be.
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.set_exception(RuntimeError('The DB writer stopped before writing the records.'))
+
+    @staticmethod
+    def serve(requests: Any, results: Any, batch_size: int, flush_interval: float, database: dict = None) -> None:
+        """
+        Loop of the writer: gathers the submissions in transactions and reports the status of their records.
+
+        :param requests: The queue of the submissions, (ticket, records) tuples.
+        :param results: The queue of the results, (ticket, statuses, error) tuples.
+        :param batch_size: The number of records after which a transaction is committed.
+        :param flush_interval: The time (in seconds) during which the submissions are gathered in a transaction.
+        :param database: The storage settings, None to keep the configuration of the current process.
+        """
+        if database:
+            base.configure(**database)
+        session = DBSession(base.get_session())
+        running = True
+        try:
+            while running:
+                submission = requests.get()
+                if submission is _END:
+                    break
+                submissions = [submission]
+                nb_records = len(submission[1])
+                deadline = time.monotonic() + flush_interval
+                while nb_records < batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        submission = requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait()
+                    except queue.Empty:
+                        break
+                    if submission is _END:
+                        running = False
+                        break
+                    submissions.append(submission)
+                    nb_records += len(submission[1])
+                for result in DBWriter.write_submissions(session=session, submissions=submissions):
+                    results.put(result)
+        finally:
+            session.session.close()
+            results.put(_END)
+
+    @staticmethod
+    def write_submissions(session: DBSession, submissions: List[Tuple[int, List[dict]]]) \
+            -> List[Tuple[int, Union[List, None], Union[str, None]]]:
+        """
+        Writes submissions in a single transaction. If it fails, the submissions are written one by one so that a
+        faulty submission does not fail the others.
+
+        :param session: The DB session of the writer.
+        :param submissions: The (ticket, records) tuples.
+        :return: The (ticket, statuses, error) tuples.
+        """
+        try:
+            statuses = session.insert_papers_bulk(
+                contents=[record for _, records in submissions for record in records]
+            )
+            session.session.commit()
+        except Exception:
+            session.session.rollback()
+            if len(submissions) == 1:
+                logger.error(f'Failed to write {len(submissions[0][1])} record(s):\n{traceback.format_exc()}')
+                return [(submissions[0][0], None, traceback.format_exc())]
+            return [
+                result
+                for submission in submissions
+                for result in DBWriter.write_submissions(session=session, submissions=[submission])
+            ]
+        results = []
+        start = 0
+        for ticket, records in submissions:
+            results.append((ticket, statuses[start:start + len(records)], None))
+            start += len(records)
+        return results
@@ -0,0 +1,173 @@
+import re
+from typing import List, Tuple
+
+from logzero import logger
+from sqlalchemy import text, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.papers.paper import Paper
+
+FTS_TABLE = 'PaperFTS'
+# The full-text index is an external content FTS5 table: it only stores the index, the text stays in the Paper table.
+# The triggers keep it in sync with every insert, update and delete, whether from the ORM or from bulk inserts.
+FTS_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5(
+        title, abstract, content='Paper', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_insert" AFTER INSERT ON "Paper" BEGIN
+        INSERT INTO "{FTS_TABLE}"(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_delete" AFTER DELETE ON "Paper" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title, abstract)
+        VALUES ('delete', old.id, old.title, old.abstract);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_update" AFTER UPDATE OF title, abstract ON "Paper" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title, abstract)
+        VALUES ('delete', old.id, old.title, old.abstract);
+        INSERT INTO "{FTS_TABLE}"(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+    END""",
+]
+
+
+def create_fts_index(engine: Engine) -> bool:
+    """
+    Creates the full-text index of the titles and abstracts of the papers and its triggers, the index of an existing
+    table is filled. Only SQLite (with FTS5) is supported, the search falls back to LIKE on the other backends.
+
+    :param engine: The engine.
+    :return: True if the index exists.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first() is not None
+            if not exists:
+                connection.execute(text(FTS_STATEMENTS[0]))
+                connection.execute(text(f'INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES (\'rebuild\')'))
+            for statement in FTS_STATEMENTS[1:]:
+                connection.execute(text(statement))
+    except OperationalError as e:
+        logger.warning(f'Could not create the full-text index, the search falls back to LIKE: {e.orig}')
+        return False
+    return True
+
+
+def rebuild_fts_index(session: Session) -> None:
+    """
+    Rebuilds the full-text index from the Paper table, e.g. after the table was modified with the triggers disabled.
+
+    :param session: The database session.
+    """
+    session.execute(text(f'INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES (\'rebuild\')'))
+    session.commit()
+
+
+class PaperSearch:
+    """
+    Full-text search of the papers over their titles and abstracts, ranked by relevance (BM25, the matches in the
+    title weighting more than the matches in the abstract).
+    """
+
+    def __init__(self, session: Session, title_weight: float = 10.0, abstract_weight: float = 1.0):
+        """
+        Constructor of the PaperSearch class.
+
+        :param session: The database session.
+        :param title_weight: The weight of the matches in the titles in the ranking.
+        :param abstract_weight: The weight of the matches in the abstracts in the ranking.
+        """
+        self.session = session
+        self.title_weight = title_weight
+        self.abstract_weight = abstract_weight
+        self._has_index = None
+
+    @property
+    def has_index(self) -> bool:
+        """
+        Returns whether the full-text index exists in the database.
+        """
+        if self._has_index is None:
+            bind = self.session.get_bind()
+            self._has_index = bind.dialect.name == 'sqlite' and self.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first() is not None
+        return self._has_index
+
+    @staticmethod
+    def to_match_query(query: str) -> str:
+        """
+        Converts free text to an FTS5 query matching the papers containing all its words (or word prefixes, with a
+        trailing *), the special characters of the FTS5 syntax being ignored.
+
+        :param query: The free text.
+        :return: The FTS5 query.
+        """
+        terms = re.findall(r'\w+\*?', query)
+        return ' '.join(f'"{term.rstrip("*")}"' + ('*' if term.endswith('*') else '') for term in terms)
+
+    def search(self, query: str, page: int = 1, per_page: int = 20, raw: bool = False) -> List[Tuple[Paper, float]]:
+        """
+        Looks for the papers whose title or abstract contains all the words of a query.
+
+        :param query: The words to look for.
+        :param page: The page of results, starting at 1.
+        :param per_page: The number of papers per page.
+        :param raw: Is the query written in the FTS5 syntax (phrases, OR, NOT, NEAR, column filters)?
+        :return: The papers of the page with their score (the higher the more relevant), by decreasing relevance.
+        """
+        offset = (page - 1) * per_page
+        if not self.has_index:
+            papers = self.like_query(query).order_by(Paper.citation_count.desc(), Paper.id)
+            return [(paper, 0.0) for paper in papers.offset(offset).limit(per_page)]
+        match = query if raw else PaperSearch.to_match_query(query)
+        if not match:
+            return []
+        rows = self.session.execute(
+            text(
+                f'SELECT rowid, -bm25("{FTS_TABLE}", :title_weight, :abstract_weight) AS score FROM "{FTS_TABLE}" '
+                f'WHERE "{FTS_TABLE}" MATCH :match ORDER BY score DESC LIMIT :limit OFFSET :offset'
+            ),
+            {
+                'title_weight': self.title_weight,
+                'abstract_weight': self.abstract_weight,
+                'match': match,
+                'limit': per_page,
+                'offset': offset
+            }
+        ).fetchall()
+        papers = {paper.id: paper for paper in self.session.query(Paper).filter(Paper.id.in_([row[0] for row in rows]))}
+        return [(papers[paper_id], score) for paper_id, score in rows if paper_id in papers]
+
+    def count(self, query: str, raw: bool = False) -> int:
+        """
+        Counts the papers whose title or abstract contains all the words of a query.
+
+        :param query: The words to look for.
+        :param raw: Is the query written in the FTS5 syntax?
+        :return: The number of papers.
+        """
+        if not self.has_index:
+            return self.like_query(query).count()
+        match = query if raw else PaperSearch.to_match_query(query)
+        if not match:
+            return 0
+        return self.session.execute(
+            text(f'SELECT count(*) FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH :match'), {'match': match}
+        ).scalar()
+
+    def like_query(self, query: str):
+        """
+        Builds the query of the papers whose title or abstract contains all the words of a query, without the index.
+
+        :param query: The words to look for.
+        :return: The query.
+        """
+        papers = self.session.query(Paper)
+        for word in re.findall(r'\w+', query):
+            papers = papers.filter(or_(Paper.title.ilike(f'%{word}%'), Paper.abstract.ilike(f'%{word}%')))
+        return papers
@@ -9,7 +9,7 @@ class PaperAuthor(Base, BaseTable):
     __tablename__ = 'PaperAuthor'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, unique=True, index=True)
     # Many to many with paper
     papers = relationship(
         "AuthorWritesPaper",
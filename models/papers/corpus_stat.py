@@ -0,0 +1,21 @@
+import sqlalchemy as db
+
+from models.base import Base
+from models.base_table import BaseTable
+
+
+class CorpusStat(Base, BaseTable):
+    """
+    Precomputed number of papers per value of a dimension of the corpus (tag, author, search string...), maintained by
+    `CorpusStats` as the papers are inserted.
+    """
+
+    __tablename__ = 'CorpusStat'
+    __table_args__ = (
+        db.Index('ix_CorpusStat_dimension_name', 'dimension', 'name', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    dimension = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False)
+    paper_count = db.Column(db.Integer, nullable=False, default=0)
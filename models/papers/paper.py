@@ -8,15 +8,22 @@ class Paper(Base, BaseTable):
     __tablename__ = 'Paper'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     source_id = db.Column(db.Integer, db.ForeignKey('Source.id'))
-    title = db.Column(db.String(128))
+    title = db.Column(db.String(128), unique=True, index=True)
+    # Hash of the normalized title, shared by the variants of a title (see `TitleDedupIndex`).
+    title_hash = db.Column(db.String(40), index=True)
     publication_date = db.Column(db.Date)
     pub_type = db.Column(db.String(128))
     content_type = db.Column(db.String(128))
     abstract = db.Column(db.String(1024))
     full_text = db.Column(db.String(1024))
     citation_count = db.Column(db.Integer)
-    doi = db.Column(db.String)
+    # Time of the last update of the citation count, and its growth (citations per day) at that update.
+    citation_count_updated_at = db.Column(db.DateTime)
+    citation_velocity = db.Column(db.Float)
+    doi = db.Column(db.String, index=True)
     url = db.Column(db.String)
+    # Link to the page of the paper on the scraped website.
+    page_url = db.Column(db.String, index=True)
 
     # Many to one in which paper is child
     # Papers can only be published in one journal at a time
@@ -10,6 +10,6 @@ class PaperTag(Base, BaseTable):
     __tablename__ = "PaperTag"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, unique=True, index=True)
 
     papers = relationship('PaperHasTag', backref='tag', cascade="save-update, merge, delete, delete-orphan")
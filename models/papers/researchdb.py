@@ -9,6 +9,6 @@ class ResearchDB(Base, BaseTable):
     __tablename__ = 'ResearchDB'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, unique=True, index=True)
     # Many to many with paper
     papers = relationship("PaperIsInDB", backref="database", cascade="save-update, merge, delete, delete-orphan")
@@ -9,7 +9,7 @@ class SearchString(Base, BaseTable):
     __tablename__ = 'SearchString'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, unique=True, index=True)
     pub_year_filter = db.Column(db.String)
 
     # Many to many with paper
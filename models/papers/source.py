@@ -7,6 +7,6 @@ from sqlalchemy.orm import relationship
 class Source(Base, BaseTable):
     __tablename__ = 'Source'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, unique=True, index=True)
     # Many to one relationship in which source is the parent
     papers = relationship("Paper", back_populates="source")
\ No newline at end of file
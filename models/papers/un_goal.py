@@ -9,5 +9,5 @@ class UNGoal(Base, BaseTable):
     __tablename__ = 'UNGoal'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, unique=True, index=True)
     papers = relationship('PaperHasUNGoal', backref='un_goal')
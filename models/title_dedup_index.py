@@ -0,0 +1,275 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Optional, Callable, Dict, Iterable, List, Hashable, FrozenSet, Tuple
+
+import numpy as np
+from logzero import logger
+from sqlalchemy.orm import Session
+
+from models.papers.paper import Paper
+
+# Prime of the hash functions of the MinHash signatures.
+_PRIME = (1 << 31) - 1
+# Number of titles whose normalized form, trigrams and signature are kept in memory: a title is looked up and added to
+# several indexes in a row.
+_CACHE_SIZE = 65536
+# Maximum number of values in an IN clause.
+_IN_CHUNK_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def _hash_coefficients(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    # The same hash functions for all the indexes, so that the signatures can be cached.
+    random_state = np.random.RandomState(seed=1)
+    return (
+        random_state.randint(1, _PRIME, size=num_perm, dtype=np.int64),
+        random_state.randint(0, _PRIME, size=num_perm, dtype=np.int64)
+    )
+
+
+class TitleDedupIndex:
+    """
+    In-memory index of the titles of the papers, to detect duplicates at insert time.
+
+    Titles are normalized (unicode, case, punctuation and spacing) and hashed: variants of a title share the same key,
+    looked up in O(1). Near-duplicates (a word added or misspelled) are found with MinHash signatures of the character
+    trigrams of the titles, split in bands (locality sensitive hashing): only the titles sharing the most bands are
+    compared. Titles with different numbers (e.g. the parts of a series) are never near-duplicates.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 8, near_matches: bool = True,
+                 max_candidates: int = 10, max_bucket_size: int = 100,
+                 title_loader: Callable[[List[Hashable]], Dict[Hashable, str]] = None):
+        """
+        Constructor of the TitleDedupIndex class.
+
+        :param threshold: The minimum Jaccard similarity of the trigrams of two titles for them to be duplicates.
+        :param num_perm: The number of hash functions of the MinHash signatures.
+        :param bands: The number of bands of the signatures, `num_perm` must be a multiple of it.
+        :param near_matches: Should near-duplicates be detected? Only exact normalized matches are detected otherwise.
+        :param max_candidates: The maximum number of titles compared to a title, the ones sharing the most bands.
+        :param max_bucket_size: The maximum number of titles sharing a band, a band shared by more titles is not
+        discriminating.
+        :param title_loader: Function returning the titles of papers by id, used to confirm the near-duplicates. The
+        titles are kept in memory if None.
+        """
+        if num_perm % bands:
+            raise ValueError('The number of hash functions must be a multiple of the number of bands.')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.near_matches = near_matches
+        self.max_candidates = max_candidates
+        self.max_bucket_size = max_bucket_size
+        self.title_loader = title_loader
+        # Normalized title hash -> id.
+        self._exact = {}
+        # Hash of a band of a signature -> ids.
+        self._buckets = {}
+        # Id -> title, when there is no title loader.
+        self._titles = {}
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    @staticmethod
+    @lru_cache(maxsize=_CACHE_SIZE)
+    def normalize_title(title: str) -> str:
+        """
+        Normalizes a title: accents, case, punctuation and spacing variants share the same normalized title.
+
+        :param title: The title.
+        :return: The normalized title.
+        """
+        if not title.isascii():
+            title = unicodedata.normalize('NFKD', title)
+            title = ''.join(char for char in title if not unicodedata.combining(char))
+        return re.sub(r'\W+', ' ', title.casefold()).strip()
+
+    @staticmethod
+    def hash_title(title: str) -> Optional[str]:
+        """
+        Returns the hash of the normalized title, stored in `Paper.title_hash`.
+
+        :param title: The title.
+        :return: The hash, None if there is no title.
+        """
+        if not title:
+            return None
+        return hashlib.sha1(TitleDedupIndex.normalize_title(title).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    @lru_cache(maxsize=_CACHE_SIZE)
+    def shingles(title: str) -> FrozenSet[str]:
+        """
+        Returns the character trigrams of the normalized title.
+
+        :param title: The title.
+        :return: The trigrams.
+        """
+        normalized = TitleDedupIndex.normalize_title(title)
+        if len(normalized) <= 3:
+            return frozenset([normalized])
+        return frozenset(normalized[i:i + 3] for i in range(len(normalized) - 2))
+
+    @staticmethod
+    def similarity(title: str, other_title: str) -> float:
+        """
+        Computes the Jaccard similarity of the trigrams of two titles, 0 if their numbers differ.
+
+        :param title: The first title.
+        :param other_title: The second title.
+        :return: The similarity, between 0 and 1.
+        """
+        if re.findall(r'\d+', title) != re.findall(r'\d+', other_title):
+            return 0
+        shingles, other_shingles = TitleDedupIndex.shingles(title), TitleDedupIndex.shingles(other_title)
+        return len(shingles & other_shingles) / len(shingles | other_shingles)
+
+    def band_keys(self, title: str) -> Tuple[int, ...]:
+        """
+        Returns the hashes of the bands of the MinHash signature of a title.
+
+        :param title: The title.
+        :return: One hash per band.
+        """
+        return TitleDedupIndex.get_band_keys(title=title, num_perm=self.num_perm, bands=self.bands)
+
+    @staticmethod
+    @lru_cache(maxsize=_CACHE_SIZE)
+    def get_band_keys(title: str, num_perm: int, bands: int) -> Tuple[int, ...]:
+        a, b = _hash_coefficients(num_perm)
+        hashes = np.array([
+            zlib.crc32(shingle.encode('utf-8')) % _PRIME for shingle in TitleDedupIndex.shingles(title)
+        ], dtype=np.int64)
+        signature = ((np.outer(hashes, a) + b) % _PRIME).min(axis=0)
+        rows = num_perm // bands
+        return tuple(hash((band, signature[band * rows:(band + 1) * rows].tobytes())) for band in range(bands))
+
+    def add(self, paper_id: Hashable, title: str, title_hash: str = None) -> None:
+        """
+        Adds a paper to the index.
+
+        :param paper_id: The id of the paper.
+        :param title: The title of the paper.
+        :param title_hash: The hash of the normalized title, computed if not provided.
+        """
+        if not title:
+            return
+        self._exact.setdefault(title_hash or TitleDedupIndex.hash_title(title), paper_id)
+        if not self.near_matches:
+            return
+        for key in self.band_keys(title):
+            bucket = self._buckets.setdefault(key, [])
+            if len(bucket) < self.max_bucket_size:
+                bucket.append(paper_id)
+        if self.title_loader is None:
+            self._titles[paper_id] = title
+
+    def find(self, title: str) -> Optional[Hashable]:
+        """
+        Looks for a duplicate of a title.
+
+        :param title: The title.
+        :return: The id of the exact or closest near-duplicate, None if there is none.
+        """
+        return self.find_many([title]).get(title)
+
+    def find_many(self, titles: Iterable[str]) -> Dict[str, Hashable]:
+        """
+        Looks for the duplicates of several titles, the titles of the candidate near-duplicates are loaded at once.
+
+        :param titles: The titles.
+        :return: The id of the exact or closest near-duplicate of the titles having one.
+        """
+        ids = {}
+        candidates = {}
+        for title in titles:
+            if not title or title in ids or title in candidates:
+                continue
+            paper_id = self._exact.get(TitleDedupIndex.hash_title(title))
+            if paper_id is not None:
+                ids[title] = paper_id
+            elif self.near_matches:
+                collisions = Counter(
+                    candidate for key in self.band_keys(title) for candidate in self._buckets.get(key, [])
+                )
+                candidates[title] = [candidate for candidate, _ in collisions.most_common(self.max_candidates)]
+        to_load = list({candidate for title_candidates in candidates.values() for candidate in title_candidates})
+        if not to_load:
+            return ids
+        candidate_titles = self.title_loader(to_load) if self.title_loader else {
+            candidate: self._titles[candidate] for candidate in to_load
+        }
+        for title, title_candidates in candidates.items():
+            scores = {
+                candidate: TitleDedupIndex.similarity(title, candidate_titles[candidate])
+                for candidate in title_candidates if candidate in candidate_titles
+            }
+            best = max(scores, key=scores.get, default=None)
+            if best is not None and scores[best] >= self.threshold:
+                ids[title] = best
+        return ids
+
+    @staticmethod
+    def from_db(session: Session, **kwargs) -> 'TitleDedupIndex':
+        """
+        Builds the index of the papers of the DB, the near-duplicates are confirmed with titles read from the DB.
+
+        :param session: The database session.
+        :param kwargs: The parameters of the index.
+        :return: The index.
+        """
+        index = TitleDedupIndex(title_loader=lambda ids: TitleDedupIndex.load_titles(session, ids), **kwargs)
+        for paper_id, title, title_hash in session.query(Paper.id, Paper.title, Paper.title_hash).yield_per(10000):
+            index.add(paper_id=paper_id, title=title, title_hash=title_hash)
+        logger.info(f'Title dedup index loaded: {len(index)} papers.')
+        return index
+
+    @staticmethod
+    def load_titles(session: Session, ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Reads the titles of papers, with chunked IN queries.
+
+        :param session: The database session.
+        :param ids: The ids of the papers.
+        :return: The titles, by id.
+        """
+        ids = list(ids)
+        return {
+            paper_id: title
+            for start in range(0, len(ids), _IN_CHUNK_SIZE)
+            for paper_id, title in session.query(Paper.id, Paper.title).filter(
+                Paper.id.in_(ids[start:start + _IN_CHUNK_SIZE])
+            )
+        }
+
+    @staticmethod
+    def rebuild(session: Session, chunk_size: int = 10000, **kwargs) -> 'TitleDedupIndex':
+        """
+        Recomputes the title hashes of all the papers of the DB in one pass, and builds the index.
+
+        :param session: The database session.
+        :param chunk_size: The number of papers updated at once.
+        :param kwargs: The parameters of the index.
+        :return: The index.
+        """
+        index = TitleDedupIndex(title_loader=lambda ids: TitleDedupIndex.load_titles(session, ids), **kwargs)
+        updates = []
+        duplicates = 0
+        for paper_id, title, title_hash in session.query(Paper.id, Paper.title, Paper.title_hash).yield_per(chunk_size):
+            new_hash = TitleDedupIndex.hash_title(title)
+            if new_hash != title_hash:
+                updates.append({'id': paper_id, 'title_hash': new_hash})
+            if index.find(title) is not None:
+                duplicates += 1
+            index.add(paper_id=paper_id, title=title, title_hash=new_hash)
+        for start in range(0, len(updates), chunk_size):
+            session.bulk_update_mappings(Paper, updates[start:start + chunk_size])
+        session.commit()
+        logger.info(f'Title dedup index rebuilt: {len(updates)} hash(es) updated, {duplicates} duplicate(s) found.')
+        return index
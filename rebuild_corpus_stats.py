@@ -0,0 +1,24 @@
+import argparse
+from time import time
+
+from logzero import logger
+
+import models.base as base
+from models.corpus_stats import CorpusStats
+from spiders_config import CONFIG
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Recomputes the number of papers per author, tag, UN goal, database, search string, source, '
+                    'keyword and keyword column from the relation tables.'
+    )
+    parser.add_argument('--show', default=None, help='Dimension whose 20 largest counts are printed afterwards.')
+    args = parser.parse_args()
+    base.configure(**CONFIG.get('database', {}))
+    session = base.get_session()
+    start = time()
+    CorpusStats.rebuild(session=session)
+    logger.info(f'Rebuilt in {round(time() - start, 2)}s.')
+    if args.show:
+        print(CorpusStats.to_dataframe(session=session, dimension=args.show, limit=20).to_string(index=False))
+    session.close()
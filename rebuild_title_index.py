@@ -0,0 +1,36 @@
+import argparse
+from time import time
+
+from logzero import logger
+
+import models.base as base
+from models.title_dedup_index import TitleDedupIndex
+from spiders_config import CONFIG
+
+
+def rebuild_title_index(chunk_size: int = 10000, threshold: float = 0.8) -> int:
+    """
+    Recomputes the normalized title hashes of the papers already in the DB (e.g. inserted before the hashes existed)
+    and reports the duplicates found, in a single pass over the table.
+
+    :param chunk_size: The number of papers read and updated at once.
+    :param threshold: The minimum similarity of two titles for them to be duplicates.
+    :return: The number of papers indexed.
+    """
+    start = time()
+    # The hash column and its index are added to a DB created before they existed.
+    session = base.get_session()
+    index = TitleDedupIndex.rebuild(session=session, chunk_size=chunk_size, threshold=threshold)
+    session.close()
+    logger.info(f'Indexed {len(index)} distinct title(s) in {round(time() - start, 2)}s.')
+    return len(index)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfills the normalized title hashes of the papers of the DB.')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Number of papers updated at once.')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                        help='Minimum similarity of two titles for them to be duplicates.')
+    args = parser.parse_args()
+    base.configure(**CONFIG.get('database', {}))
+    rebuild_title_index(chunk_size=args.chunk_size, threshold=args.threshold)
@@ -0,0 +1,96 @@
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from time import time
+from typing import Optional
+
+from logzero import logger
+
+import models.base as base
+from models.db_session import DBSession
+from scrapers.base_spiders.microsoft_academics import MicrosoftAcademicsSpider
+from scrapers.parsers.ma_paper_parser import MAPaperParser
+from scrapers.utils.page_cache import PageCache
+from spiders_config import CONFIG
+
+
+def parse_entry(path: str) -> Optional[dict]:
+    """
+    Re-extracts the record of a paper from the HTML stored in a page cache entry, without a browser.
+
+    :param path: The path of the entry.
+    :return: The record formatted for the DB, None if the entry has no HTML or cannot be parsed. The record holds the
+    time at which the page was fetched, so that its citation count does not replace a more recent one.
+    """
+    try:
+        entry = PageCache.read(path)
+        if not entry.get('html'):
+            return None
+        fields = MAPaperParser.parse_html(html=entry['html'], url=entry['url'])
+        metadata = entry.get('metadata', {})
+        record = MAPaperParser.to_record(
+            fields=fields,
+            citation_count=metadata.get('citation_count'),
+            page_url=entry['url']
+        )
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f'Could not parse {path}: {e}')
+        return None
+    return {
+        **record,
+        'search_string': {'name': metadata.get('search_string')},
+        'fetched_at': datetime.fromtimestamp(entry['fetched_at']) if entry.get('fetched_at') else None,
+        'database': MicrosoftAcademicsSpider.QUERY_DATABASE
+    }
+
+
+def reparse_archive(directory: str, processes: int = None, limit: int = None, chunksize: int = 64,
+                    batch_size: int = 500) -> int:
+    """
+    Re-parses all the pages archived in the page cache over a process pool and inserts the records to the DB.
+
+    :param directory: The directory of the page cache.
+    :param processes: The number of worker processes, defaults to the number of CPUs.
+    :param limit: The maximum number of pages to re-parse.
+    :param chunksize: The number of pages sent to a worker at once.
+    :param batch_size: The number of papers inserted at once.
+    :return: The number of papers inserted.
+    """
+    start = time()
+    session = DBSession(base.get_session())
+    paths = itertools.islice(PageCache(directory=directory, max_size_mb=None, ttl_days=None).paths(), limit)
+    insert_count, parsed_count, failed_count = 0, 0, 0
+    batch = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for record in executor.map(parse_entry, paths, chunksize=chunksize):
+            if record is None:
+                failed_count += 1
+                continue
+            parsed_count += 1
+            batch.append(record)
+            if len(batch) >= batch_size:
+                insert_count += sum(int(inserted) for inserted, _ in session.insert_papers_bulk(contents=batch))
+                session.session.commit()
+                batch = []
+    if batch:
+        insert_count += sum(int(inserted) for inserted, _ in session.insert_papers_bulk(contents=batch))
+    session.session.commit()
+    session.session.close()
+    logger.info(
+        f'Re-parsed {parsed_count} page(s) ({failed_count} skipped), inserted {insert_count} paper(s) '
+        f'in {round(time() - start, 2)}s.'
+    )
+    return insert_count
+
+
+if __name__ == '__main__':
+    page_cache_config = CONFIG['spiders']['MicrosoftAcademicsSpider'].get('page_cache') or {}
+    parser = argparse.ArgumentParser(description='Re-parses the pages archived in the page cache, without a browser.')
+    parser.add_argument('--directory', default=page_cache_config.get('directory', 'page_cache'),
+                        help='Directory of the page cache.')
+    parser.add_argument('--processes', type=int, default=None, help='Number of worker processes.')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of pages to re-parse.')
+    args = parser.parse_args()
+    base.configure(**CONFIG.get('database', {}))
+    reparse_archive(directory=args.directory, processes=args.processes, limit=args.limit)
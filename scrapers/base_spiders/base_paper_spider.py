@@ -1,17 +1,20 @@
 from abc import abstractmethod
-from typing import Union, Tuple
+from typing import Union, Tuple, List
 
 from scrapers.base_spiders.base_spider import BaseSpider
 from models.db_session import DBSession
+from models.db_writer import DBWriter
 
 
 class BasePaperSpider(BaseSpider):
 
-    def __init__(self, db_session: DBSession, page_limit: int = None, citation_count_filter: int = 5, **kwargs):
+    def __init__(self, db_session: DBSession, page_limit: int = None, citation_count_filter: int = 5,
+                 db_writer: DBWriter = None, **kwargs):
         super().__init__(db_session=db_session, page_limit=page_limit, **kwargs)
         self.paper_count = 0
         self.citation_count_filter = citation_count_filter
-        self.papers = []
+        # Writer shared by the spiders, the papers are inserted through the DB session of the spider if None.
+        self.db_writer = db_writer
 
     @property
     @abstractmethod
@@ -40,8 +43,8 @@ class BasePaperSpider(BaseSpider):
         self.logger.info(f' > PARSING PAPER NUMBER ({self.paper_count})')
         self.paper_count += 1
 
-    def insert_data(self) -> int:
-        return super().insert_data()
+    def insert_data(self, papers: List[dict]) -> int:
+        return super().insert_data(papers)
 
     def insert_to_db(self, content: dict) -> Tuple[bool, Union[str, None]]:
         """
@@ -55,3 +58,17 @@ class BasePaperSpider(BaseSpider):
                 'database': self.QUERY_DATABASE
             }
         )
+
+    def insert_batch_to_db(self, contents: List[dict]) -> List[Tuple[bool, Union[str, None]]]:
+        """
+        Inserts and commits a batch of articles to the project DB with bulk inserts, through the DB writer if any.
+        :param contents: The contents of the articles to insert.
+        :return: for every article, a tuple with a boolean indicating whether the article has been added and an
+        eventual error message.
+        """
+        contents = [{**content, 'database': self.QUERY_DATABASE} for content in contents if content]
+        if self.db_writer is not None:
+            return self.db_writer.write(contents).result()
+        statuses = self.session.insert_papers_bulk(contents=contents)
+        self.session.session.commit()
+        return statuses
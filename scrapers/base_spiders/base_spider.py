@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Union
+from typing import Union, List
 from selenium.webdriver.firefox.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 from logzero import logger
@@ -45,10 +45,11 @@ class BaseSpider:
         self.page_count += 1
 
     @abstractmethod
-    def insert_data(self) -> int:
+    def insert_data(self, papers: List[dict]) -> int:
         """
-        Inserts data into the DB.
+        Inserts a batch of data into the DB.
 
+        :param papers: The data to insert.
         :return: The number of rows inserted.
         """
         raise NotImplementedError('You should implement this method.')
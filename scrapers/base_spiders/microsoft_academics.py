@@ -1,11 +1,10 @@
 import os
-from pathlib import Path
-from typing import List, Union, Dict, Optional
-from datetime import datetime
+from typing import List, Union, Dict, Optional, Tuple, Any
 import itertools
-import time
-import pandas as pd
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from multiprocessing.util import Finalize
 
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.common.exceptions import (
@@ -15,9 +14,19 @@ from selenium.common.exceptions import (
 )
 from selenium.webdriver.common.keys import Keys
 
+import models.base as base
 from models.db_session import DBSession
 from scrapers.base_spiders.base_paper_spider import BasePaperSpider
-from scrapers.utils.driver_factory import DriverFactory
+from scrapers.utils.driver_manager import DriverManager
+from scrapers.utils.driver_pool import DriverPool
+from scrapers.utils.ma_driver import MADriver
+from scrapers.parsers.ma_paper_parser import MAPaperParser
+from scrapers.utils.latency_tracker import LatencyTracker
+from scrapers.utils.seen_paper_index import SeenPaperIndex
+from scrapers.utils.page_cache import PageCache
+from scrapers.utils.pipeline import PaperPipeline
+from scrapers.utils.crawl_journal import CrawlJournal
+from scrapers.utils.paper_exporter import PaperExporter
 from queries.ma_query import MAQuery
 from queries.query_generator import MicrosoftAcademicsQueryGenerator
 
@@ -28,7 +37,11 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
 
     def __init__(self, db_session: DBSession, page_limit: int = None, citation_count_filter: int = 5, timeout: int = 10,
                  max_queries: int = 2, headless: List[bool] = None, pub_year_filter: int = 2005, csv_path: str = None,
-                 nb_keywords: int = 3, keyword_file: str = None, **kwargs):
+                 nb_keywords: int = 3, keyword_file: str = None, driver_pool_size: int = 1, query_processes: int = 1,
+                 adaptive_timeouts: dict = None, browser_profile: str = 'default', driver_manager: DriverManager = None,
+                 driver_lifecycle: dict = None, seen_index_path: str = None, page_cache: dict = None,
+                 pipeline: dict = None, crawl_journal: str = None, resume: bool = False, export: dict = None,
+                 **kwargs):
         """
 
         @param db_session: Database session
@@ -39,9 +52,26 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
         @param headless: Should the browser be displayed when crawling ? [bool, bool], first is for search page,
         second is for articles.
         @param pub_year_filter: Minimum year to scrape an article.
-        @param csv_path: Directory in which to save the csv
+        @param csv_path: Directory in which to save the csv, when no export is configured.
         @param nb_keywords: Number of keywords per search string
         @param keyword_file: Name of the file to automatically generate the search strings
+        @param driver_pool_size: Number of browsers used in parallel to parse the paper pages.
+        @param query_processes: Number of worker processes running the search strings in parallel, each with its own
+        drivers. 1 runs the search strings one after the other in the current process.
+        @param adaptive_timeouts: Parameters of the LatencyTracker deriving the timeouts of the waits from the
+        observed latencies, `timeout` being the ceiling.
+        @param browser_profile: Name of the browser profile of the drivers, see `DriverFactory.PROFILES`.
+        @param driver_manager: Manager of the drivers, shared with other spiders so that the browsers are reused.
+        @param driver_lifecycle: Parameters of the DriverManager created when none is provided.
+        @param seen_index_path: Path of the file of the index of the papers already scraped, whose pages are not
+        visited again. None disables the index.
+        @param page_cache: Parameters of the PageCache of the pages of the papers. None disables the cache.
+        @param pipeline: Parameters of the PaperPipeline streaming the links and the papers (queue_size, batch_size,
+        flush_interval).
+        @param crawl_journal: Path of the CrawlJournal recording the progress of the runs. None disables the journal.
+        @param resume: Should the last unfinished run be resumed, instead of starting a new one? Needs the journal.
+        @param export: Parameters of the PaperExporter writing the scraped papers to partitioned Parquet, Arrow or csv
+        files. None exports them to a single csv in `csv_path`.
         @param kwargs: Additional config, not used for now.
         """
         super().__init__(db_session, page_limit, citation_count_filter, **kwargs)
@@ -50,38 +80,259 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
         self.csv_path = csv_path
         self.nb_keywords = nb_keywords
         self.keyword_file = keyword_file
-        headless = headless or [False, False]
+        self.timeout = timeout
+        self.headless = headless or [False, False]
+        self.driver_pool_size = driver_pool_size
+        self.query_processes = query_processes
+        self.adaptive_timeouts = adaptive_timeouts or {}
+        self.browser_profile = browser_profile
+        # The spider only quits the browsers of the manager if it created it.
+        self.owns_driver_manager = driver_manager is None
+        self.driver_manager = driver_manager or DriverManager(**(driver_lifecycle or {}))
+        # Parameters needed to rebuild the spider in a worker process. They are sent to the workers, so only plain
+        # values are listed: the live objects (DB session and writer, driver manager) stay in the current process, the
+        # workers send their papers to its pipeline.
+        self.config = {
+            'page_limit': page_limit,
+            'citation_count_filter': citation_count_filter,
+            'timeout': timeout,
+            'max_queries': max_queries,
+            'headless': self.headless,
+            'pub_year_filter': pub_year_filter,
+            'csv_path': csv_path,
+            'nb_keywords': nb_keywords,
+            'keyword_file': keyword_file,
+            'driver_pool_size': driver_pool_size,
+            'adaptive_timeouts': adaptive_timeouts,
+            'browser_profile': browser_profile,
+            'driver_lifecycle': self.driver_manager.settings,
+            'seen_index_path': seen_index_path,
+            'page_cache': page_cache,
+            'pipeline': pipeline,
+            'crawl_journal': crawl_journal,
+            'export': export,
+            'database': base.get_settings()
+        }
+        self.seen_papers = SeenPaperIndex(path=seen_index_path).load() if seen_index_path else None
+        self.page_cache = PageCache(**page_cache) if page_cache else None
+        self.pipeline_settings = pipeline or {}
+        self.driver = None
+        self.page_drivers = None
+        self.pipeline = None
+        self.journal = CrawlJournal(path=crawl_journal) if crawl_journal else None
+        self.resume = resume
+        # Id of the run in the journal, position of the current search string in the run and number of pages of
+        # results already listed for it.
+        self.run_id = None
+        self.query_position = None
+        self.resume_page = 0
+        # Known papers whose paper was not in the DB yet, written again with the next batches.
+        self.unresolved_papers = []
+        if export:
+            self.exporter = PaperExporter(**export)
+        elif csv_path:
+            self.exporter = PaperExporter(
+                directory=os.path.join(csv_path, self.QUERY_DATABASE),
+                format='csv',
+                partition_by=[],
+                file_name='papers.csv'
+            )
+        else:
+            self.exporter = None
+
+    def open_drivers(self) -> None:
+        """
+        Gets the search driver and the pool of drivers used to parse the paper pages from the driver manager.
+        The missing browsers are all started at the same time.
+        """
         self.logger.info('Getting the drivers...')
-        self.driver = DriverFactory.get_driver(headless=headless[0], timeout=timeout)
-        self.page_driver = DriverFactory.get_driver(headless=headless[1], timeout=timeout)
+        self.driver_manager.prewarm([
+            (self.headless[0], self.browser_profile, 1),
+            (self.headless[1], self.browser_profile, self.driver_pool_size)
+        ])
+        self.driver = self.driver_manager.acquire(
+            headless=self.headless[0],
+            timeout=self.timeout,
+            profile=self.browser_profile,
+            latencies=LatencyTracker(**self.adaptive_timeouts)
+        )
+        self.page_drivers = DriverPool(
+            size=self.driver_pool_size,
+            headless=self.headless[1],
+            timeout=self.timeout,
+            latencies=LatencyTracker(**self.adaptive_timeouts),
+            profile=self.browser_profile,
+            manager=self.driver_manager
+        )
         self.logger.info('Drivers loaded.')
 
+    def close_drivers(self) -> None:
+        """
+        Gives the drivers of the spider back to the driver manager, they are quit if the spider owns the manager.
+        """
+        if self.driver is not None:
+            self.driver_manager.release(self.driver)
+            self.driver = None
+        if self.page_drivers is not None:
+            self.page_drivers.quit()
+            self.page_drivers = None
+        if self.owns_driver_manager:
+            self.driver_manager.quit_all()
+
     def run(self):
         """
         Crawls microsoft academics.
         @return: The number of rows inserted to the DB.
         """
-        start_url = MicrosoftAcademicsSpider.start_urls[0]
-        for search_string in MicrosoftAcademicsQueryGenerator.get_search_strings(
-                keyword_file=self.keyword_file,
-                nb_queries=self.max_queries,
-                nb_keywords=3):
-            self.logger.info(f'Scraping data for the following search string: {search_string.query}')
-            self.papers += self.parse(url=start_url, query=search_string)
-        self.driver.quit()
-        self.page_driver.quit()
-        return self.insert_data()
+        search_strings = self.get_search_strings()
+        if self.query_processes > 1:
+            insert_count = self.run_in_processes(search_strings=search_strings)
+            self.finish_run()
+            return insert_count
+        self.open_drivers()
+        # The papers are inserted batch by batch while the search strings are crawled.
+        self.pipeline = PaperPipeline(
+            pool=self.page_drivers,
+            parse_link=self.parse_paper_entry,
+            writer=self.insert_data,
+            **self.pipeline_settings
+        ).start()
+        try:
+            for position, search_string in enumerate(search_strings):
+                self.parse_search_string(search_string=search_string, position=position)
+        finally:
+            insert_count = self.close_pipeline()
+            self.close_drivers()
+        self.finish_run()
+        return insert_count
+
+    def get_search_strings(self) -> List[MAQuery]:
+        """
+        Generates the search strings of a new run, recorded in the journal. When resuming, the search strings of the
+        last unfinished run are read from the journal instead.
+
+        @return: The search strings to run.
+        """
+        if self.journal is not None and self.resume:
+            self.run_id = self.journal.last_unfinished_run(spider=self.__class__.__name__)
+            if self.run_id is not None:
+                self.logger.info(f'Resuming the run {self.run_id}.')
+                return self.journal.get_search_strings(run_id=self.run_id)
+            self.logger.info('No unfinished run to resume, starting a new run.')
+        search_strings = MicrosoftAcademicsQueryGenerator.get_search_strings(
+            keyword_file=self.keyword_file,
+            nb_queries=self.max_queries,
+            nb_keywords=3
+        )
+        if self.journal is not None:
+            self.run_id = self.journal.start_run(spider=self.__class__.__name__, search_strings=search_strings)
+        return search_strings
+
+    def finish_run(self) -> None:
+        """
+        Marks the run as finished in the journal, it will not be resumed. A run with search strings that failed or
+        papers that were not committed is left unfinished, to be resumed.
+        """
+        if self.journal is None or self.run_id is None:
+            return
+        if self.journal.is_complete(run_id=self.run_id):
+            self.journal.finish_run(run_id=self.run_id)
+        else:
+            self.logger.warning(f'The run {self.run_id} is incomplete, run the spiders with --resume to complete it.')
+
+    def run_in_processes(self, search_strings: List[MAQuery]) -> int:
+        """
+        Runs every search string in a worker process with its own drivers. The papers of the workers are streamed to
+        the writer of the current process, which inserts them batch by batch.
+
+        @param search_strings: The search strings to run.
+        @return: The number of papers inserted.
+        """
+        nb_processes = min(self.query_processes, len(search_strings)) or 1
+        self.logger.info(f'Running {len(search_strings)} search strings on {nb_processes} processes.')
+        with Manager() as manager:
+            records = manager.Queue(maxsize=self.pipeline_settings.get('queue_size', 100))
+            self.pipeline = PaperPipeline(writer=self.insert_data, records=records, **self.pipeline_settings).start()
+            try:
+                # The spider of every worker is built once, its indexes are not reloaded for every search string.
+                with ProcessPoolExecutor(max_workers=nb_processes, initializer=init_worker_process,
+                                         initargs=(self.config,)) as executor:
+                    list(executor.map(
+                        parse_search_string_in_process,
+                        itertools.repeat(self.run_id),
+                        range(len(search_strings)),
+                        search_strings,
+                        itertools.repeat(records)
+                    ))
+            finally:
+                insert_count = self.close_pipeline()
+        if self.page_cache is not None:
+            # The workers do not evict the pages of the cache, it is done once they are done.
+            self.page_cache.rescan()
+            self.page_cache.evict()
+        return insert_count
 
-    def parse(self, url: str, query: MAQuery) -> List[dict]:
+    def close_pipeline(self) -> int:
+        """
+        Waits for the papers of the pipeline to be parsed and written, then stops it and closes the files of the export.
+
+        @return: The number of papers inserted by the pipeline.
+        """
+        if self.pipeline is None:
+            return 0
+        insert_count = self.pipeline.close()
+        self.pipeline = None
+        if self.unresolved_papers:
+            # Last attempt, the paper of a known paper may have been committed by the last batch.
+            try:
+                self.insert_data([])
+            except Exception:
+                self.logger.error(f'Failed to write the known papers:\n{traceback.format_exc()}')
+            for paper in self.unresolved_papers:
+                self.logger.warning(f'Paper {paper.get("title") or paper.get("page_url")} not found in the DB, its '
+                                    f'search string could not be linked.')
+            self.unresolved_papers = []
+        if self.exporter is not None:
+            self.exporter.close()
+        return insert_count
+
+    def parse_search_string(self, search_string: MAQuery, position: int = None) -> int:
+        """
+        Crawls all the papers of one search string, the drivers and the pipeline must be opened.
+        When the run is journaled, the papers queued but not committed by a previous attempt are queued again and the
+        pages of results already listed are skipped.
+
+        @param search_string: The search string to run.
+        @param position: The position of the search string in the run, None if the run is not journaled.
+        @return: The number of papers sent to the pipeline.
+        """
+        self.logger.info(f'Scraping data for the following search string: {search_string.query}')
+        self.query_position = position if self.journal is not None and self.run_id is not None else None
+        self.resume_page = 0
+        papers = 0
+        if self.query_position is not None:
+            self.resume_page, done = self.journal.get_progress(run_id=self.run_id, position=position)
+            pending = self.journal.pending_papers(run_id=self.run_id, position=position)
+            if pending:
+                self.logger.info(f'Queuing again {len(pending)} paper(s) of an interrupted run.')
+                papers += self.queue_entries(entries=pending, query=search_string)
+            if done:
+                self.logger.info('All the pages of this search string were already listed.')
+                return papers
+        # The search driver is replaced between search strings if it loaded too many pages or grew too big.
+        self.driver = self.driver_manager.refresh(self.driver)
+        return papers + self.parse(url=MicrosoftAcademicsSpider.start_urls[0], query=search_string)
+
+    def parse(self, url: str, query: MAQuery) -> int:
         """
         Parses the home page of microsoft academics. Inputs a query in the search bar and crawls the result page.
         @param url: url of the page to parse
         @param query: query to enter in the search bar.
-        @return: The list of papers extracted from this query.
+        @return: The number of papers of this query sent to the pipeline.
         """
         self.driver.get(url)
         self.page_count = 1
-        papers = []
+        papers = 0
         try:
             # Wait for the search bar to be there and click on an element of the screen to make cookie bar disappear.
             self.driver.wait_and_click(
@@ -90,14 +341,12 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
                 css_selector='.hp-suggestions > h1.title',
                 ignore_exceptions=[False, False]
             )
-            # time.sleep(2)
             # Wait for the cookie bar to disappear (logo is visible)
             self.driver.wait_for_css_class(
                 func=ec.element_to_be_clickable,
                 css_class='hp-suggestions',
                 ignore_exceptions=False
             )
-            # time.sleep(2)
             # Look for the search input, clear the content, click on it, send the search query.
             element = self.driver.find_elements_by_css_selector('div.suggestion-box > input#search-input')[0]
             element.click()
@@ -118,12 +367,11 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
                     'ma-data-bar > div.au-target.ma-data-bar'
                 )
             ]
-            # time.sleep(2)
-            # Filter on Journal publications.
+            # Filter on Journal publications, and wait for the list of papers to be reloaded.
             for box, publication_type in types:
                 if publication_type == 'Journal publications':
-                    box.click()
-            time.sleep(2)
+                    with self.driver.waiting_for_change(css_selector='div.primary_paper'):
+                        box.click()
             # Selecting the right date range (2005-present) and click on the date range to display choices.
             self.driver.wait_and_click(
                 func=ec.visibility_of_element_located,
@@ -131,8 +379,8 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
                 css_selector='div.au-target.ma-year-range-dropdown',
                 ignore_exceptions=[False, True]
             )
-            time.sleep(1)
-            # Getting all the possible values.
+            # Wait for the choices to be displayed and get all the possible values.
+            self.driver.wait_for_selector(css_selector='div.au-target.year-item', state='visible')
             choices = self.driver.find_elements_by_css_selector('div.au-target.year-item')
             year_choices = [
                 int(elm.find_element_by_css_selector('div.year-value').text) >= self.pub_year_filter
@@ -140,118 +388,141 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
             ]
             choices = list(itertools.compress(choices, year_choices))
             if len(choices):
-                choices[0].click()
-                time.sleep(1)
-                choices[-1].click()
-                time.sleep(1)
+                # The list of papers is reloaded once the range is selected, the snapshot is taken before the first
+                # click so that the wait covers a reload triggered by either click.
+                with self.driver.waiting_for_change(css_selector='div.primary_paper'):
+                    choices[0].click()
+                    choices[-1].click()
             # Wait for the click to be done
             self.driver.wait_for_papers_to_load()
             # 1 is arbitrary value just so it's not None.
             next_page_element = 1
             while next_page_element is not None and (self.page_limit is None or self.page_count <= self.page_limit):
-                papers += self.parse_paper_list(url=url, query=query)
+                page = self.page_count
+                if page <= self.resume_page:
+                    # Listed before the run was interrupted, its papers were queued again from the journal.
+                    self.page_count += 1
+                else:
+                    papers += self.parse_paper_list(url=url, query=query)
+                    if self.query_position is not None:
+                        self.journal.page_done(run_id=self.run_id, position=self.query_position, page=page)
                 next_page_element = self.driver.get_next_page_link()
                 self.driver.go_to_next_page(next_page_element=next_page_element)
                 # self.parse_next_page(driver=driver, next_page_element=next_page_element)
+            if self.query_position is not None:
+                self.journal.search_string_done(run_id=self.run_id, position=self.query_position)
             # driver.quit()
             return papers
         except (NoSuchElementException, TimeoutException):
             self.logger.warning(traceback.print_exc())
             # driver.quit()
             self.logger.warning('Nothing parsed on page.')
-            return papers or []
+            return papers
 
-    def parse_paper_list(self, url: str, query: MAQuery) -> Optional[List[dict]]:
+    def parse_paper_list(self, url: str, query: MAQuery) -> int:
         """
-        Parses the list of papers on a given page.
+        Parses the list of papers on a given page, the links of the papers are sent to the detail workers of the
+        pipeline, blocking while they are busy.
 
         :param url: The URL to parse
         :param query: The query to fetch the paper.
-        :return: A list of papers as dict elements.
+        :return: The number of papers sent to the pipeline.
         """
         super().parse(url=url, query='')
-        # Getting a list of tuples with the paper and its citation count.
-        links_citations = list(zip(
-            self.driver.get_href_list(css_string='div.primary_paper > a.title', ignore_exceptions=False),
-            self.driver.get_text_list(
-                css_string='div.citation > a > span',
-                lambda_transform=lambda x: int(x.split()[0].replace(',', ''))
-            )
-        ))
-        papers = [
-            self.parse_paper(link=link, query=query, citation_count=citation)
-            for link, citation in links_citations
+        # Getting the link, citation count, title and year of every paper of the list in a single call.
+        entries = self.driver.extract_list(
+            container_css=MAPaperParser.LIST_CONTAINER,
+            fields=MAPaperParser.LIST_FIELDS,
+            scope_css=MAPaperParser.LIST_SCOPE
+        )
+        # Only the papers that pass the citation filter are opened.
+        entries = [
+            entry for entry in entries
+            if entry['href'] and (entry['citation_count'] or 0) >= self.citation_count_filter
         ]
-        if papers:
-            # Filtering out the None values.
-            papers = list(itertools.chain(*list(filter(None, papers))))
-            if papers:
-                return papers
-        return []
+        self.logger.info(f'{len(entries)} paper(s) pass the citation filter on this page.')
+        return self.queue_entries(entries=entries, query=query)
+
+    def queue_entries(self, entries: List[dict], query: MAQuery) -> int:
+        """
+        Sends the papers of a list of results to the pipeline, they are recorded in the journal first.
+
+        :param entries: The entries of the papers in the list, with their 'href', 'citation_count' and 'title'.
+        :param query: The query of the list.
+        :return: The number of papers sent to the pipeline.
+        """
+        if self.query_position is not None:
+            self.journal.papers_queued(run_id=self.run_id, position=self.query_position, entries=entries)
+        # The papers already scraped are not visited again, only their search string and citation count are recorded.
+        # They are found in the DB by title or, when the list has none, by link.
+        known_papers = []
+        if self.seen_papers is not None:
+            is_known = [self.seen_papers.contains(link=entry['href'], title=entry['title']) for entry in entries]
+            known_papers = [
+                MicrosoftAcademicsSpider.format_for_db(
+                    content={
+                        'title': entry['title'],
+                        'page_url': entry['href'],
+                        'citation_count': entry['citation_count'],
+                        'known': True
+                    },
+                    query=query
+                )
+                for entry, known in zip(entries, is_known) if known
+            ]
+            entries = list(itertools.compress(entries, [not known for known in is_known]))
+            for entry in entries:
+                self.seen_papers.queue(link=entry['href'], title=entry['title'])
+            self.logger.info(f'{len(known_papers)} paper(s) of this page were already scraped.')
+        for paper in known_papers:
+            self.pipeline.put_record(paper)
+        # The paper pages are parsed in parallel by the detail workers, one per driver of the pool.
+        for entry in entries:
+            self.pipeline.put_link((entry, query))
+        return len(known_papers) + len(entries)
+
+    def parse_paper_entry(self, driver: MADriver, link: Tuple[dict, MAQuery]) -> Union[List[Dict], None]:
+        """
+        Parses the page of a paper of a list, called by the detail workers of the pipeline.
+
+        @param driver: The driver used to load the page.
+        @param link: The entry of the paper in the list and the search string.
+        @return: The content scraped on the page.
+        """
+        entry, query = link
+        return self.parse_paper(link=entry['href'], query=query, citation_count=entry['citation_count'], driver=driver)
 
-    def parse_paper(self, link: str, query: MAQuery, citation_count: int) -> Union[List[Dict], None]:
+    def parse_paper(self, link: str, query: MAQuery, citation_count: int,
+                    driver: MADriver = None) -> Union[List[Dict], None]:
         """
         Parse the content of the page of a single paper
 
         @param link: url to the paper page
         @param query: search string
         @param citation_count: Citation limit to parse content
+        @param driver: The driver used to load the page, a driver is taken from the pool if not provided.
         @return: The content scraped on the page.
         """
+        if driver is None:
+            with self.page_drivers.driver() as driver:
+                return self.parse_paper(link=link, query=query, citation_count=citation_count, driver=driver)
         super().parse_paper(link='', query=query.query, citation_count=citation_count)
         citation_filter = self.citation_count_filter
-        if citation_count < citation_filter:
+        # The cards of the list without citations have no citation count.
+        if (citation_count or 0) < citation_filter:
             return None
-        self.page_driver.get(link)
         try:
-            # Wait for the main section to be visible and expand the categories if possible.
-            self.page_driver.wait_and_click(
-                func=ec.visibility_of_element_located,
-                css_class='name-section',
-                css_selector='div.tag-cloud > div.show-more',
-                ignore_exceptions=[False, True]
-            )
-            # Wait for the categories to be expanded and expand the authors if possible.
-            self.page_driver.wait_and_click(
-                func=ec.visibility_of_element_located,
-                css_class='authors',
-                css_selector='div.authors > div.show-more',
-                ignore_exceptions=[False, True]
-            )
-            self.page_driver.wait_for_css_class(
-                func=ec.visibility_of_element_located,
-                css_class='authors',
-                ignore_exceptions=False
-            )
-            # Get the data
-            d = {
-                'title': self.page_driver.get_text(css_string='div.name-section > h1.name'),
-                'publication_date': datetime(
-                    year=int(self.page_driver.get_text(css_string='div.name-section > a.publication > span.year')),
-                    month=1,
-                    day=1
-                ),
-                'source': self.page_driver.get_text(css_string='div.name-section > a.publication > span.pub-name'),
-                'doi': self.page_driver.get_text(
-                    css_string='div.name-section > a.doiLink',
-                    lambda_transform=lambda x: x.replace('DOI: ', '').strip(),
-                    ignore_exceptions=True
-                ),
-                'abstract': self.page_driver.get_text(css_string='div.name-section > p'),
-                'tags': self.page_driver.get_text_list(
-                    css_string='ma-link-tag > a.ma-tag > div.text',
-                    ignore_exceptions=True
-                ),
-                'authors': self.page_driver.get_text_list(
-                    css_string='div.authors > div.author-item > a.author.link',
-                    ignore_exceptions=True
-                ),
-                'url': self.page_driver.get_href(
-                    css_string='div.ma-link-collection > a.ma-link-collection-item',
-                    ignore_exceptions=True
-                ),
-                'citation_count': citation_count
-            }
+            # The fields of the page are read from the cache when possible, the browser is only used on a miss.
+            cached = self.page_cache.get(link) if self.page_cache is not None else None
+            if cached is not None:
+                d = cached['fields']
+            else:
+                d = self.fetch_paper_fields(
+                    link=link,
+                    driver=driver,
+                    metadata={'citation_count': citation_count, 'search_string': query.__str__()}
+                )
+            d = MAPaperParser.to_record(fields=d, citation_count=citation_count, page_url=link)
             return [MicrosoftAcademicsSpider.format_for_db(content=d, query=query)]
         except TimeoutException:
             self.logger.warning("Timed out waiting for page to load")
@@ -266,46 +537,87 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
             pass
             # driver.close()
 
-    def insert_data(self) -> int:
+    def fetch_paper_fields(self, link: str, driver: MADriver, metadata: dict = None) -> dict:
         """
-        Inserts all the data int the papers DB.
+        Loads the page of a paper in the browser and extracts its fields, the fields are added to the page cache.
 
-        :return: The number of papers inserted.
+        @param link: url to the paper page
+        @param driver: The driver used to load the page.
+        @param metadata: Context of the crawl stored with the page in the cache.
+        @return: The fields extracted from the page.
         """
-        self.logger.info(f'Inserting {len(self.papers)} papers :')
-        if len(self.papers) < 50:
-            self.logger.info('\n'.join([paper['title'] for paper in self.papers]))
-        if self.papers:
-            insert_count = sum([int(self.insert_to_db(paper)[0]) for paper in self.papers if paper])
-            self.session.session.commit()
-            # TODO remove
-            self.save_data_to_csv()
-            return insert_count
-        else:
-            return 0
+        driver.get(link)
+        # Wait for the main section and the authors to be visible, and expand the categories and the authors if
+        # possible. The buttons are optional, so their waits fail fast.
+        for css_class, show_more in [
+            ('name-section', 'div.tag-cloud > div.show-more'),
+            ('authors', 'div.authors > div.show-more')
+        ]:
+            driver.wait_for_css_class(
+                func=ec.visibility_of_element_located,
+                css_class=css_class,
+                ignore_exceptions=False
+            )
+            if driver.wait_for_selector(css_selector=show_more, state='clickable', optional=True):
+                driver.find_and_click(css_string=show_more, ignore_exceptions=True)
+        # Get the data in a single call to the browser.
+        fields = driver.extract(fields=MAPaperParser.FIELDS)
+        if self.page_cache is not None:
+            self.page_cache.put(
+                url=link,
+                fields=fields,
+                html=driver.page_source if self.page_cache.store_html else None,
+                metadata=metadata
+            )
+        return fields
 
-    def save_data_to_csv(self):
-        """
-        Saves the extracted data to csv.
+    def insert_data(self, papers: List[dict]) -> int:
         """
-        directory = os.path.join(self.csv_path, self.QUERY_DATABASE)
-        Path(directory).mkdir(parents=True, exist_ok=True)
-        file = os.path.join(directory, 'papers.csv')
-        pd.DataFrame([MicrosoftAcademicsSpider.format_for_csv(paper) for paper in self.papers])\
-            .drop_duplicates(subset=['title'])\
-            .to_csv(path_or_buf=file)
+        Inserts a batch of papers in the papers DB and exports them, called by the writer of the pipeline.
 
-    @staticmethod
-    def format_for_csv(d: dict) -> dict:
-        """
-        Formats the data for it to be exported to csv.
-        :param d: The dictionary to format
-        :return: The formatted dictionary.
+        The known papers whose paper is not in the DB yet (e.g. queued earlier in the run but still being parsed) are kept
+        and written again with the next batches.
+
+        :param papers: The papers to insert.
+        :return: The number of papers inserted.
         """
-        d['tags'] = ','.join(d['tags'])
-        d['authors'] = ','.join(d['authors'])
-        d['search_string'] = d['search_string']['name']
-        return d
+        # The known papers may have no title, they are then identified by their link.
+        papers = self.unresolved_papers + [
+            paper for paper in papers if paper and (paper.get('title') or paper.get('page_url'))
+        ]
+        self.logger.info(f'Inserting {len(papers)} papers :')
+        if len(papers) < 50:
+            self.logger.info('\n'.join([paper.get('title') or paper['page_url'] for paper in papers]))
+        if papers:
+            statuses = self.insert_batch_to_db(papers)
+            insert_count = sum([int(inserted) for inserted, _ in statuses])
+            self.unresolved_papers = [
+                paper for paper, (_, message) in zip(papers, statuses)
+                if paper.get('known') and message == DBSession.NOT_FOUND
+            ]
+            self.logger.info(f'{insert_count} new paper(s), {len(papers) - insert_count} already in the DB.')
+            if self.journal is not None and self.run_id is not None:
+                unresolved = {id(paper) for paper in self.unresolved_papers}
+                self.journal.papers_done(
+                    run_id=self.run_id,
+                    urls=[paper['page_url'] for paper in papers if paper.get('page_url') and id(paper) not in unresolved]
+                )
+            if self.seen_papers is not None:
+                # The papers are only added to the index once committed, those of a failed batch are scraped again by
+                # the next runs.
+                for paper in papers:
+                    if not paper.get('known'):
+                        self.seen_papers.add(
+                            link=paper.get('page_url'),
+                            title=paper.get('title'),
+                            doi=paper.get('doi')
+                        )
+                self.seen_papers.flush()
+            if self.exporter is not None:
+                self.exporter.write(papers)
+            return insert_count
+        else:
+            return 0
 
     @staticmethod
     def format_for_db(content: dict, query: MAQuery) -> Optional[Dict]:
@@ -323,3 +635,73 @@ class MicrosoftAcademicsSpider(BasePaperSpider):
                 'name': query.__str__()
             }
         }
+
+
+# Driver manager of a worker process, its browsers are reused by all the search strings run in the process.
+_process_driver_manager = None
+
+
+def get_process_driver_manager(settings: dict) -> DriverManager:
+    """
+    Returns the driver manager of the current worker process, creating it on first use. Its browsers are quit when the
+    process exits.
+
+    @param settings: The parameters of the driver manager.
+    @return: The driver manager.
+    """
+    global _process_driver_manager
+    if _process_driver_manager is None:
+        _process_driver_manager = DriverManager(**settings)
+        Finalize(None, _process_driver_manager.quit_all, exitpriority=10)
+    return _process_driver_manager
+
+
+# Spider of a worker process, built by `init_worker_process` and reused by all the search strings run in the process.
+_process_spider = None
+
+
+def init_worker_process(config: dict) -> None:
+    """
+    Initializer of the worker processes of `MicrosoftAcademicsSpider.run_in_processes`, builds the spider of the process
+    (loading its index of the papers already scraped and its page cache) once.
+
+    @param config: The parameters of the spider.
+    """
+    global _process_spider
+    # Spawned workers do not inherit the storage configuration of the parent process.
+    if config['database'] and base.get_settings() != config['database']:
+        base.configure(**config['database'])
+    _process_spider = MicrosoftAcademicsSpider(
+        db_session=None,
+        driver_manager=get_process_driver_manager(settings=config['driver_lifecycle']),
+        # The pages of the cache are only evicted by the parent process.
+        page_cache={**config['page_cache'], 'max_size_mb': None} if config['page_cache'] else None,
+        **{key: value for key, value in config.items() if key not in ('driver_lifecycle', 'database', 'page_cache')}
+    )
+
+
+def parse_search_string_in_process(run_id: Optional[int], position: int, search_string: MAQuery, records: Any) -> int:
+    """
+    Entry point of the worker processes of `MicrosoftAcademicsSpider.run_in_processes`. Crawls one search string with
+    the spider and the drivers of the process, the papers are sent to the writer of the parent process.
+
+    @param run_id: The id of the run in the journal, None if the run is not journaled.
+    @param position: The position of the search string in the run.
+    @param search_string: The search string to run.
+    @param records: The queue of the records of the pipeline of the parent process.
+    @return: The number of papers sent to the parent process.
+    """
+    spider = _process_spider
+    spider.run_id = run_id
+    spider.open_drivers()
+    spider.pipeline = PaperPipeline(
+        pool=spider.page_drivers,
+        parse_link=spider.parse_paper_entry,
+        records=records,
+        **spider.pipeline_settings
+    ).start()
+    try:
+        return spider.parse_search_string(search_string=search_string, position=position)
+    finally:
+        spider.close_pipeline()
+        spider.close_drivers()
@@ -0,0 +1,118 @@
+import re
+from datetime import datetime
+from typing import Optional, Dict, Any
+from urllib.parse import urljoin
+
+import lxml.html
+
+from scrapers.utils.field_selector import FieldSelector
+
+
+def parse_count(text: str) -> Optional[int]:
+    """
+    Parses a number displayed on the page, such as '1,234 Citations'.
+
+    @param text: The text to parse.
+    @return: The number, None if the text does not start with a number.
+    """
+    try:
+        return int(text.split()[0].replace(',', ''))
+    except (IndexError, ValueError):
+        return None
+
+
+class MAPaperParser:
+    """
+    Extraction rules of the pages of Microsoft Academics. The rules are used by the spider on the live pages (through
+    `MADriver.extract`) and by `parse_html` on saved HTML, without a browser.
+    """
+
+    # Fields extracted from the page of a paper.
+    FIELDS = {
+        'title': FieldSelector(css='div.name-section > h1.name'),
+        'year': FieldSelector(css='div.name-section > a.publication > span.year', transform=int),
+        'source': FieldSelector(css='div.name-section > a.publication > span.pub-name'),
+        'doi': FieldSelector(
+            css='div.name-section > a.doiLink',
+            optional=True,
+            transform=lambda x: x.replace('DOI: ', '').strip()
+        ),
+        'abstract': FieldSelector(css='div.name-section > p'),
+        'tags': FieldSelector(css='ma-link-tag > a.ma-tag > div.text', many=True, optional=True),
+        'authors': FieldSelector(css='div.authors > div.author-item > a.author.link', many=True, optional=True),
+        'url': FieldSelector(css='div.ma-link-collection > a.ma-link-collection-item', attribute='href', optional=True),
+    }
+    # Citation count displayed on the page of a paper, read alone when the citation counts are refreshed.
+    CITATION_FIELDS = {
+        'citation_count': FieldSelector(css='div.stats ma-statistics-item div.count', transform=parse_count),
+    }
+    # Fields extracted from every paper of a result page, relative to the card of the paper.
+    LIST_CONTAINER = 'div.primary_paper'
+    LIST_SCOPE = 'ma-card'
+    LIST_FIELDS = {
+        'href': FieldSelector(css='div.primary_paper > a.title', attribute='href'),
+        'citation_count': FieldSelector(css='div.citation > a > span', transform=parse_count),
+        'title': FieldSelector(css='div.primary_paper > a.title'),
+        'year': FieldSelector(css='div.primary_paper span.year', transform=parse_count),
+    }
+
+    @staticmethod
+    def parse_html(html: str, url: str = None) -> Dict[str, Any]:
+        """
+        Extracts the fields of the page of a paper from its HTML.
+
+        :param html: The rendered HTML of the page.
+        :param url: The URL of the page, to resolve the relative links.
+        :return: The extracted fields, by name.
+        """
+        document = lxml.html.fromstring(html)
+        content = {}
+        for name, field in MAPaperParser.FIELDS.items():
+            values = [
+                MAPaperParser.read(element=element, attribute=field.attribute, url=url)
+                for element in document.cssselect(field.css)
+            ]
+            values = [value for value in values if value]
+            if field.many:
+                value = values
+            elif values:
+                value = values[0]
+            elif field.optional:
+                value = None
+            else:
+                raise ValueError(f'Unable to locate element: {field.css}')
+            if value is not None and field.transform is not None:
+                value = [field.transform(elm) for elm in value] if field.many else field.transform(value)
+            content[name] = value
+        return content
+
+    @staticmethod
+    def read(element, attribute: str, url: str = None) -> Optional[str]:
+        """
+        Reads the text or the link of an element, as the browser would.
+
+        :param element: The lxml element.
+        :param attribute: 'text' or 'href'.
+        :param url: The URL of the page, to resolve the relative links.
+        :return: The value.
+        """
+        if attribute == 'text':
+            return re.sub(r'\s+', ' ', element.text_content()).strip()
+        value = element.get(attribute)
+        return urljoin(url, value) if value and url else value
+
+    @staticmethod
+    def to_record(fields: dict, citation_count: int, page_url: str) -> dict:
+        """
+        Builds the record of a paper from the fields extracted from its page.
+
+        :param fields: The extracted fields.
+        :param citation_count: The citation count of the paper, read on the result list.
+        :param page_url: The link to the page of the paper.
+        :return: The record.
+        """
+        record = {key: value for key, value in fields.items() if key != 'year'}
+        record['publication_date'] = datetime(year=fields['year'], month=1, day=1)
+        record['citation_count'] = citation_count
+        record['page_url'] = page_url
+        return record
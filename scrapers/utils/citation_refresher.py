@@ -0,0 +1,181 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from logzero import logger
+from selenium.common.exceptions import WebDriverException
+
+from models.db_session import DBSession
+from models.papers.paper import Paper
+from scrapers.parsers.ma_paper_parser import MAPaperParser
+from scrapers.utils.driver_manager import DriverManager
+from scrapers.utils.driver_pool import DriverPool
+from scrapers.utils.latency_tracker import LatencyTracker
+from scrapers.utils.ma_driver import MADriver
+
+
+class CitationRefresher:
+    """
+    Refreshes the citation counts of the papers of the DB without running the search queries again: only the pages of
+    the stalest papers are visited, within a budget of pages per run.
+
+    The staleness of a paper grows with the time since its count was updated, weighted by how fast the count was
+    growing at the last update, so that the papers whose counts move the most are refreshed first.
+    """
+
+    def __init__(self, db_session: DBSession, driver_manager: DriverManager = None, budget: int = 200,
+                 min_age_days: float = 30, velocity_weight: float = 1.0, batch_size: int = 50, pool_size: int = 4,
+                 headless: bool = True, timeout: int = 10, browser_profile: str = 'scrape',
+                 adaptive_timeouts: dict = None):
+        """
+        Constructor of the CitationRefresher class.
+
+        :param db_session: The database session.
+        :param driver_manager: The manager of the drivers, a new one is created if not provided.
+        :param budget: The maximum number of pages visited per run.
+        :param min_age_days: The minimum time since the last update of a count for the paper to be refreshed, in days.
+        :param velocity_weight: The weight of the growth of the count (citations per day) in the staleness.
+        :param batch_size: The number of papers whose counts are updated at once.
+        :param pool_size: The number of browsers used in parallel.
+        :param headless: Should the browsers be run without being displayed?
+        :param timeout: Timeout limit to load resources.
+        :param browser_profile: Name of the browser profile of the drivers, see `DriverFactory.PROFILES`.
+        :param adaptive_timeouts: Parameters of the LatencyTracker of the drivers.
+        """
+        self.session = db_session
+        self.owns_driver_manager = driver_manager is None
+        self.driver_manager = driver_manager or DriverManager()
+        self.budget = budget
+        self.min_age_days = min_age_days
+        self.velocity_weight = velocity_weight
+        self.batch_size = batch_size
+        self.pool_size = pool_size
+        self.headless = headless
+        self.timeout = timeout
+        self.browser_profile = browser_profile
+        self.adaptive_timeouts = adaptive_timeouts or {}
+
+    def staleness(self, updated_at: Optional[datetime], velocity: Optional[float], now: datetime) -> float:
+        """
+        Computes the staleness of the citation count of a paper.
+
+        :param updated_at: The time of the last update of the count, None if it was never timestamped.
+        :param velocity: The growth of the count at the last update, in citations per day.
+        :param now: The current time.
+        :return: The staleness, infinite for a count that was never timestamped.
+        """
+        if updated_at is None:
+            return float('inf')
+        age_days = (now - updated_at).total_seconds() / 86400
+        if age_days < self.min_age_days:
+            return 0
+        return age_days * (1 + self.velocity_weight * max(velocity or 0, 0))
+
+    def select_papers(self, now: datetime = None) -> List[Tuple[int, str, Optional[int], Optional[datetime]]]:
+        """
+        Selects the stalest papers that have a page, up to the budget.
+
+        :param now: The current time, defaults to now.
+        :return: The id, page, citation count and time of the last update of the count of the papers, stalest first.
+        """
+        now = now or datetime.now()
+        rows = self.session.session.query(
+            Paper.id,
+            Paper.page_url,
+            Paper.citation_count,
+            Paper.citation_count_updated_at,
+            Paper.citation_velocity
+        ).filter(Paper.page_url.isnot(None)).yield_per(10000)
+        scored = (
+            (self.staleness(updated_at=row[3], velocity=row[4], now=now), row[:4])
+            for row in rows
+        )
+        return [paper for score, paper in heapq.nlargest(self.budget, scored, key=lambda x: x[0]) if score > 0]
+
+    def run(self) -> int:
+        """
+        Refreshes the citation counts of the stalest papers.
+
+        :return: The number of papers whose count was refreshed.
+        """
+        papers = self.select_papers()
+        logger.info(f'Refreshing the citation counts of {len(papers)} paper(s).')
+        if not papers:
+            return 0
+        pool = DriverPool(
+            size=min(self.pool_size, len(papers)),
+            headless=self.headless,
+            timeout=self.timeout,
+            latencies=LatencyTracker(**self.adaptive_timeouts),
+            profile=self.browser_profile,
+            manager=self.driver_manager
+        )
+        refreshed = 0
+
+        def fetch(paper: Tuple[int, str, Optional[int], Optional[datetime]]) -> Optional[int]:
+            with pool.driver() as driver:
+                return CitationRefresher.fetch_citation_count(driver=driver, link=paper[1])
+
+        # One thread per driver of the pool.
+        executor = ThreadPoolExecutor(max_workers=pool.size)
+        try:
+            for start in range(0, len(papers), self.batch_size):
+                batch = papers[start:start + self.batch_size]
+                refreshed += self.update_counts(papers=batch, counts=list(executor.map(fetch, batch)))
+        finally:
+            executor.shutdown(wait=True)
+            pool.quit()
+            if self.owns_driver_manager:
+                self.driver_manager.quit_all()
+        logger.info(f'Refreshed the citation counts of {refreshed} paper(s).')
+        return refreshed
+
+    @staticmethod
+    def fetch_citation_count(driver: MADriver, link: str) -> Optional[int]:
+        """
+        Reads the citation count on the page of a paper.
+
+        :param driver: The driver used to load the page.
+        :param link: The link to the page of the paper.
+        :return: The citation count, None if it could not be read.
+        """
+        try:
+            driver.get(link)
+            css = MAPaperParser.CITATION_FIELDS['citation_count'].css
+            if not driver.wait_for_selector(css_selector=css, state='visible'):
+                return None
+            return driver.extract(fields=MAPaperParser.CITATION_FIELDS)['citation_count']
+        except WebDriverException as e:
+            logger.warning(f'Could not read the citation count of {link}: {e}')
+            return None
+
+    def update_counts(self, papers: List[Tuple[int, str, Optional[int], Optional[datetime]]],
+                      counts: List[Optional[int]]) -> int:
+        """
+        Updates the citation counts of a batch of papers in a single transaction.
+
+        :param papers: The id, page, citation count and time of the last update of the count of the papers.
+        :param counts: The new citation counts, None for the papers whose count could not be read.
+        :return: The number of papers updated.
+        """
+        now = datetime.now()
+        mappings = [
+            {
+                'id': paper_id,
+                'citation_count': count,
+                'citation_count_updated_at': now,
+                'citation_velocity': DBSession.get_citation_velocity(
+                    previous_count=previous_count,
+                    previous_time=previous_time,
+                    citation_count=count,
+                    now=now
+                )
+            }
+            for (paper_id, _, previous_count, previous_time), count in zip(papers, counts)
+            if count is not None
+        ]
+        if mappings:
+            self.session.session.bulk_update_mappings(Paper, mappings)
+            self.session.session.commit()
+        return len(mappings)
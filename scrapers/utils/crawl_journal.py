@@ -0,0 +1,224 @@
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import List, Optional, Tuple, Iterable
+
+from queries.ma_query import MAQuery
+
+
+class CrawlJournal:
+    """
+    Journal of the state of the crawls, kept in a small SQLite file so that an interrupted run can be resumed.
+
+    For every run, it records the search strings generated, the last page of results listed for each search string,
+    and the papers queued from these pages. A paper is marked as done once it is committed to the papers DB, the papers
+    still queued when a run stops are queued again when it is resumed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            spider TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            finished_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS search_strings (
+            run_id INTEGER NOT NULL REFERENCES runs (id),
+            position INTEGER NOT NULL,
+            query TEXT NOT NULL,
+            columns TEXT NOT NULL,
+            last_page INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, position)
+        );
+        CREATE TABLE IF NOT EXISTS papers (
+            run_id INTEGER NOT NULL REFERENCES runs (id),
+            url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            entry TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, url)
+        );
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor of the CrawlJournal class.
+
+        :param path: The path of the SQLite file of the journal.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The journal is written by the spider and by the writer of its pipeline, and by the worker processes.
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(CrawlJournal.SCHEMA)
+        self._lock = Lock()
+
+    def _execute(self, sql: str, parameters: Iterable = ()) -> list:
+        with self._lock:
+            return self._connection.execute(sql, tuple(parameters)).fetchall()
+
+    def _execute_many(self, sql: str, rows: List[tuple]) -> None:
+        if not rows:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.execute('BEGIN')
+                self._connection.executemany(sql, rows)
+
+    def start_run(self, spider: str, search_strings: List[MAQuery]) -> int:
+        """
+        Records a new run and its search strings.
+
+        :param spider: The name of the spider.
+        :param search_strings: The search strings of the run, in order.
+        :return: The id of the run.
+        """
+        with self._lock:
+            run_id = self._connection.execute(
+                'INSERT INTO runs (spider, started_at) VALUES (?, ?)',
+                (spider, time.time())
+            ).lastrowid
+        self._execute_many(
+            'INSERT INTO search_strings (run_id, position, query, columns) VALUES (?, ?, ?, ?)',
+            [
+                (run_id, position, json.dumps(search_string.query), json.dumps(search_string.columns))
+                for position, search_string in enumerate(search_strings)
+            ]
+        )
+        return run_id
+
+    def last_unfinished_run(self, spider: str) -> Optional[int]:
+        """
+        Returns the last run of a spider that did not finish.
+
+        :param spider: The name of the spider.
+        :return: The id of the run, None if the last run finished or there is none.
+        """
+        rows = self._execute('SELECT id, finished_at FROM runs WHERE spider = ? ORDER BY id DESC LIMIT 1', [spider])
+        if not rows or rows[0][1] is not None:
+            return None
+        return rows[0][0]
+
+    def finish_run(self, run_id: int) -> None:
+        """
+        Marks a run as finished, it will not be resumed.
+
+        :param run_id: The id of the run.
+        """
+        self._execute('UPDATE runs SET finished_at = ? WHERE id = ?', [time.time(), run_id])
+
+    def is_complete(self, run_id: int) -> bool:
+        """
+        Checks whether all the pages of results of the search strings of a run were listed and all the papers queued
+        were committed.
+
+        :param run_id: The id of the run.
+        :return: True if nothing is left to resume.
+        """
+        rows = self._execute(
+            'SELECT EXISTS (SELECT 1 FROM search_strings WHERE run_id = ? AND done = 0) '
+            'OR EXISTS (SELECT 1 FROM papers WHERE run_id = ? AND done = 0)',
+            [run_id, run_id]
+        )
+        return not rows[0][0]
+
+    def get_search_strings(self, run_id: int) -> List[MAQuery]:
+        """
+        Returns the search strings of a run.
+
+        :param run_id: The id of the run.
+        :return: The search strings, in order.
+        """
+        return [
+            MAQuery(query=json.loads(query), columns=json.loads(columns))
+            for query, columns in self._execute(
+                'SELECT query, columns FROM search_strings WHERE run_id = ? ORDER BY position',
+                [run_id]
+            )
+        ]
+
+    def get_progress(self, run_id: int, position: int) -> Tuple[int, bool]:
+        """
+        Returns the progress of a search string of a run.
+
+        :param run_id: The id of the run.
+        :param position: The position of the search string in the run.
+        :return: The last page of results listed, and whether all its pages were listed.
+        """
+        rows = self._execute(
+            'SELECT last_page, done FROM search_strings WHERE run_id = ? AND position = ?',
+            [run_id, position]
+        )
+        return (rows[0][0], bool(rows[0][1])) if rows else (0, False)
+
+    def page_done(self, run_id: int, position: int, page: int) -> None:
+        """
+        Records that all the papers of a page of results of a search string were queued.
+
+        :param run_id: The id of the run.
+        :param position: The position of the search string in the run.
+        :param page: The number of the page.
+        """
+        self._execute(
+            'UPDATE search_strings SET last_page = MAX(last_page, ?) WHERE run_id = ? AND position = ?',
+            [page, run_id, position]
+        )
+
+    def search_string_done(self, run_id: int, position: int) -> None:
+        """
+        Records that all the pages of results of a search string were listed.
+
+        :param run_id: The id of the run.
+        :param position: The position of the search string in the run.
+        """
+        self._execute('UPDATE search_strings SET done = 1 WHERE run_id = ? AND position = ?', [run_id, position])
+
+    def papers_queued(self, run_id: int, position: int, entries: List[dict]) -> None:
+        """
+        Records the papers of a page queued to be parsed, the papers already recorded are left unchanged.
+
+        :param run_id: The id of the run.
+        :param position: The position of the search string of the papers in the run.
+        :param entries: The entries of the papers in the list of results, with their 'href'.
+        """
+        self._execute_many(
+            'INSERT OR IGNORE INTO papers (run_id, url, position, entry) VALUES (?, ?, ?, ?)',
+            [(run_id, entry['href'], position, json.dumps(entry)) for entry in entries]
+        )
+
+    def papers_done(self, run_id: int, urls: List[str]) -> None:
+        """
+        Records that papers were committed to the papers DB.
+
+        :param run_id: The id of the run.
+        :param urls: The links to the pages of the papers.
+        """
+        self._execute_many('UPDATE papers SET done = 1 WHERE run_id = ? AND url = ?', [(run_id, url) for url in urls])
+
+    def pending_papers(self, run_id: int, position: int) -> List[dict]:
+        """
+        Returns the papers of a search string that were queued but not committed.
+
+        :param run_id: The id of the run.
+        :param position: The position of the search string in the run.
+        :return: The entries of the papers in the list of results.
+        """
+        return [
+            json.loads(entry) for entry, in self._execute(
+                'SELECT entry FROM papers WHERE run_id = ? AND position = ? AND done = 0',
+                [run_id, position]
+            )
+        ]
+
+    def close(self) -> None:
+        """
+        Closes the connection to the journal.
+        """
+        with self._lock:
+            self._connection.close()
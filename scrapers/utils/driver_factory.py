@@ -1,17 +1,109 @@
+from typing import List
+from urllib.parse import quote
+
 from selenium.webdriver import FirefoxOptions
 
+from scrapers.utils.latency_tracker import LatencyTracker
 from scrapers.utils.ma_driver import MADriver
 
 
 class DriverFactory:
 
+    # Named browser profiles: Firefox preferences and URL patterns (shell expressions) whose requests are blocked.
+    PROFILES = {
+        'default': {
+            'preferences': {},
+            'blocked_urls': []
+        },
+        # Lightweight profile for crawling: only what is read by the spiders is downloaded.
+        # Stylesheets are kept, the waits rely on the visibility of the elements.
+        'scrape': {
+            'preferences': {
+                # Images, fonts and media.
+                'permissions.default.image': 2,
+                'browser.display.use_document_fonts': 0,
+                'gfx.downloadable_fonts.enabled': False,
+                'media.autoplay.default': 5,
+                'media.peerconnection.enabled': False,
+                # Trackers.
+                'privacy.trackingprotection.enabled': True,
+                'privacy.trackingprotection.socialtracking.enabled': True,
+                'privacy.trackingprotection.cryptomining.enabled': True,
+                'privacy.trackingprotection.fingerprinting.enabled': True,
+                # Caches: the memory cache is kept for the scripts shared by all the pages, nothing goes to disk.
+                'browser.cache.disk.enable': False,
+                'browser.cache.offline.enable': False,
+                'browser.cache.memory.capacity': 65536,
+                # Memory.
+                'browser.sessionhistory.max_entries': 2,
+                'browser.sessionhistory.max_total_viewers': 0,
+                'dom.ipc.processCount': 1,
+                'browser.tabs.remote.separatePrivilegedContentProcess': False,
+                # Background requests.
+                'network.prefetch-next': False,
+                'network.dns.disablePrefetch': True,
+                'network.http.speculative-parallel-limit': 0,
+                'browser.safebrowsing.malware.enabled': False,
+                'browser.safebrowsing.phishing.enabled': False,
+                'datareporting.healthreport.uploadEnabled': False,
+                'toolkit.telemetry.enabled': False,
+                'extensions.pocket.enabled': False,
+                'app.update.auto': False,
+            },
+            'blocked_urls': [
+                '*google-analytics.com*',
+                '*googletagmanager.com*',
+                '*doubleclick.net*',
+                '*clarity.ms*',
+                '*bat.bing.com*',
+                '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+                '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.svg*', '*.ico*', '*.webp*',
+                '*.mp4*', '*.webm*',
+            ]
+        }
+    }
+
     def __init__(self):
         pass
 
     @staticmethod
-    def get_driver(headless: bool = True, timeout: int = 5) -> MADriver:
+    def get_driver(headless: bool = True, timeout: int = 5, latencies: LatencyTracker = None,
+                   profile: str = 'default') -> MADriver:
+        """
+        Builds a driver.
+
+        :param headless: Should the browser be run without being displayed?
+        :param timeout: Timeout limit to load resources.
+        :param latencies: The latency tracker of the driver.
+        :param profile: The name of the browser profile, see `PROFILES`.
+        :return: The driver.
+        """
+        if profile not in DriverFactory.PROFILES:
+            raise KeyError(f'Unknown browser profile {profile}, available profiles : {list(DriverFactory.PROFILES)}.')
         options = FirefoxOptions()
         if headless:
             options.add_argument('--headless')
-        return MADriver(firefox_options=options, timeout=timeout)
+        for name, value in DriverFactory.PROFILES[profile]['preferences'].items():
+            options.set_preference(name, value)
+        blocked_urls = DriverFactory.PROFILES[profile]['blocked_urls']
+        if blocked_urls:
+            # The blocked requests are sent to a proxy that refuses the connection, through a proxy auto-config.
+            options.set_preference('network.proxy.type', 2)
+            options.set_preference('network.proxy.autoconfig_url', DriverFactory.get_blocking_pac(blocked_urls))
+            options.set_preference('network.proxy.autoconfig_url.include_path', True)
+        driver = MADriver(firefox_options=options, timeout=timeout, latencies=latencies)
+        driver.headless = headless
+        driver.profile = profile
+        return driver
+
+    @staticmethod
+    def get_blocking_pac(blocked_urls: List[str]) -> str:
+        """
+        Builds a proxy auto-config, as a data URL, that blocks the requests matching the given patterns.
 
+        :param blocked_urls: The URL patterns to block, as shell expressions.
+        :return: The data URL of the proxy auto-config.
+        """
+        conditions = ' || '.join(f'shExpMatch(url, "{pattern}")' for pattern in blocked_urls)
+        pac = f'function FindProxyForURL(url, host) {{ return ({conditions}) ? "PROXY 127.0.0.1:9" : "DIRECT"; }}'
+        return 'data:application/x-ns-proxy-autoconfig,' + quote(pac)
@@ -0,0 +1,207 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import List, Tuple, Optional
+
+import psutil
+from logzero import logger
+from selenium.common.exceptions import WebDriverException
+
+from scrapers.utils.driver_factory import DriverFactory
+from scrapers.utils.latency_tracker import LatencyTracker
+from scrapers.utils.ma_driver import MADriver
+
+
+class DriverManager:
+    """
+    Manages the lifecycle of the drivers: browsers are started concurrently, kept idle between uses so that they are
+    reused across spiders and runs, health-checked before being handed out and recycled once they loaded too many
+    pages or use too much memory.
+    """
+
+    def __init__(self, max_pages: int = 500, max_memory_mb: float = 1500, memory_check_interval: int = 10,
+                 max_startup_workers: int = 8):
+        """
+        Constructor of the DriverManager class.
+
+        :param max_pages: Number of pages after which a browser is replaced by a new one, None to disable.
+        :param max_memory_mb: Memory (RSS of the browser and its content processes) after which a browser is replaced
+        by a new one, None to disable.
+        :param memory_check_interval: Number of checks of a driver for recycling (e.g. checkouts from a DriverPool)
+        between two measures of its memory, which walk all the processes of the browser.
+        :param max_startup_workers: Maximum number of browsers started at the same time.
+        """
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_interval = max(1, memory_check_interval)
+        self.max_startup_workers = max_startup_workers
+        # Idle drivers, by (headless, profile).
+        self._idle = defaultdict(list)
+        self._lock = Lock()
+
+    @property
+    def settings(self) -> dict:
+        """
+        The parameters of the manager, to build an identical manager in another process.
+        """
+        return {
+            'max_pages': self.max_pages,
+            'max_memory_mb': self.max_memory_mb,
+            'memory_check_interval': self.memory_check_interval,
+            'max_startup_workers': self.max_startup_workers
+        }
+
+    def prewarm(self, requirements: List[Tuple[bool, str, int]]) -> None:
+        """
+        Starts concurrently the browsers missing to satisfy the requirements, they are kept idle until acquired.
+
+        :param requirements: A list of (headless, profile, count).
+        """
+        to_start = []
+        with self._lock:
+            for headless, profile, count in requirements:
+                missing = count - len(self._idle[(headless, profile)])
+                to_start += [(headless, profile)] * max(0, missing)
+        if not to_start:
+            return
+        logger.info(f'Starting {len(to_start)} browser(s).')
+        with ThreadPoolExecutor(max_workers=min(len(to_start), self.max_startup_workers)) as executor:
+            drivers = list(executor.map(
+                lambda key: DriverFactory.get_driver(headless=key[0], profile=key[1]),
+                to_start
+            ))
+        with self._lock:
+            for key, driver in zip(to_start, drivers):
+                self._idle[key].append(driver)
+
+    def acquire(self, headless: bool = True, timeout: int = 5, profile: str = 'default',
+                latencies: LatencyTracker = None) -> MADriver:
+        """
+        Returns a healthy idle driver with the given settings, or starts a new one.
+
+        :param headless: Should the browser be run without being displayed?
+        :param timeout: Timeout limit to load resources.
+        :param profile: The name of the browser profile.
+        :param latencies: The latency tracker of the driver.
+        :return: The driver.
+        """
+        driver = None
+        while driver is None:
+            with self._lock:
+                idle = self._idle[(headless, profile)]
+                candidate = idle.pop() if idle else None
+            if candidate is None:
+                driver = DriverFactory.get_driver(headless=headless, profile=profile)
+            elif candidate.is_alive():
+                driver = candidate
+            else:
+                logger.warning('Discarding a browser that does not respond.')
+                DriverManager.quit_driver(candidate)
+        driver.set_timeout(timeout)
+        driver.latencies = latencies or LatencyTracker()
+        return driver
+
+    def acquire_many(self, count: int, headless: bool = True, timeout: int = 5, profile: str = 'default',
+                     latencies: LatencyTracker = None) -> List[MADriver]:
+        """
+        Acquires several drivers with the same settings, the missing browsers are started concurrently.
+
+        :param count: The number of drivers.
+        :param headless: Should the browsers be run without being displayed?
+        :param timeout: Timeout limit to load resources.
+        :param profile: The name of the browser profile.
+        :param latencies: The latency tracker shared by the drivers.
+        :return: The drivers.
+        """
+        self.prewarm([(headless, profile, count)])
+        return [
+            self.acquire(headless=headless, timeout=timeout, profile=profile, latencies=latencies)
+            for _ in range(count)
+        ]
+
+    def release(self, driver: MADriver) -> None:
+        """
+        Gives back a driver so that it can be reused, it is quit if it should be recycled.
+
+        :param driver: The driver.
+        """
+        if self.needs_recycling(driver) or not driver.is_alive():
+            DriverManager.quit_driver(driver)
+            return
+        with self._lock:
+            self._idle[(driver.headless, driver.profile)].append(driver)
+
+    def refresh(self, driver: MADriver) -> MADriver:
+        """
+        Replaces a driver by a new one with the same settings if it should be recycled.
+
+        :param driver: The driver.
+        :return: The same driver, or its replacement.
+        """
+        if not self.needs_recycling(driver):
+            return driver
+        logger.info(f'Recycling a browser after {driver.page_loads} pages.')
+        replacement = DriverFactory.get_driver(
+            headless=driver.headless,
+            timeout=driver.timeout,
+            latencies=driver.latencies,
+            profile=driver.profile
+        )
+        DriverManager.quit_driver(driver)
+        return replacement
+
+    def needs_recycling(self, driver: MADriver) -> bool:
+        """
+        Checks if a driver loaded too many pages or uses too much memory.
+
+        :param driver: The driver.
+        :return: True if the driver should be replaced.
+        """
+        if self.max_pages is not None and driver.page_loads >= self.max_pages:
+            return True
+        driver.recycling_checks += 1
+        if self.max_memory_mb is not None and driver.recycling_checks % self.memory_check_interval == 0:
+            memory = DriverManager.memory_mb(driver)
+            if memory is not None and memory > self.max_memory_mb:
+                return True
+        return False
+
+    @staticmethod
+    def memory_mb(driver: MADriver) -> Optional[float]:
+        """
+        Returns the memory used by the browser of a driver, including its content processes.
+
+        :param driver: The driver.
+        :return: The resident memory in MB, None if it cannot be measured.
+        """
+        pid = driver.capabilities.get('moz:processID')
+        if pid is None:
+            return None
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / 2 ** 20
+        except psutil.Error:
+            return None
+
+    @staticmethod
+    def quit_driver(driver: MADriver) -> None:
+        """
+        Quits a driver, ignoring the errors of a browser that already died.
+
+        :param driver: The driver.
+        """
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def quit_all(self) -> None:
+        """
+        Quits all the idle drivers.
+        """
+        with self._lock:
+            drivers = [driver for drivers in self._idle.values() for driver in drivers]
+            self._idle.clear()
+        for driver in drivers:
+            DriverManager.quit_driver(driver)
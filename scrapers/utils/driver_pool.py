@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+from queue import Queue
+
+from scrapers.utils.driver_manager import DriverManager
+from scrapers.utils.latency_tracker import LatencyTracker
+from scrapers.utils.ma_driver import MADriver
+
+
+class DriverPool:
+    """
+    Bounded pool of MADriver instances. Each driver is checked out by one task at a time with `driver`, so the tasks
+    of the threads sharing the pool run in parallel on at most `size` browsers.
+    The drivers are acquired from a DriverManager, which recycles them when needed and gets them back once the pool is
+    closed.
+    """
+
+    def __init__(self, size: int = 2, headless: bool = True, timeout: int = 5, latencies: LatencyTracker = None,
+                 profile: str = 'default', manager: DriverManager = None):
+        """
+        Constructor of the DriverPool class.
+
+        :param size: The number of browsers in the pool.
+        :param headless: Should the browsers be run without being displayed?
+        :param timeout: Timeout limit to load resources.
+        :param latencies: The latency tracker shared by the drivers of the pool.
+        :param profile: The name of the browser profile of the drivers, see `DriverFactory.PROFILES`.
+        :param manager: The manager of the drivers, a new one is created if not provided.
+        """
+        self.size = max(1, size)
+        self.latencies = latencies or LatencyTracker()
+        self.manager = manager or DriverManager()
+        self._drivers = Queue(maxsize=self.size)
+        for driver in self.manager.acquire_many(
+                count=self.size,
+                headless=headless,
+                timeout=timeout,
+                profile=profile,
+                latencies=self.latencies):
+            self._drivers.put(driver)
+
+    @contextmanager
+    def driver(self) -> MADriver:
+        """
+        Checks out a driver from the pool, blocking until one is available, and gives it back once done.
+        A driver that should be recycled is replaced before being given back to the pool.
+
+        :return: The checked out driver.
+        """
+        driver = self._drivers.get()
+        try:
+            yield driver
+        finally:
+            self._drivers.put(self.manager.refresh(driver))
+
+    def quit(self) -> None:
+        """
+        Gives all the drivers of the pool back to the manager.
+        """
+        while not self._drivers.empty():
+            self.manager.release(self._drivers.get())
+
+    @property
+    def size(self):
+        return self.__size
+
+    @size.setter
+    def size(self, value):
+        self.__size = value
@@ -0,0 +1,18 @@
+from typing import NamedTuple, Callable, Optional
+
+
+class FieldSelector(NamedTuple):
+    """
+    Declarative description of a field to extract from a page.
+
+    css: The CSS selector of the element(s).
+    attribute: 'text' to read the text of the element, 'href' to read its link.
+    many: Should all the matching elements be read (as a list) instead of the first one?
+    optional: Can the element be missing from the page? A missing required single element raises.
+    transform: An optional transformation to apply to the value (to every value if `many` is True).
+    """
+    css: str
+    attribute: str = 'text'
+    many: bool = False
+    optional: bool = False
+    transform: Optional[Callable] = None
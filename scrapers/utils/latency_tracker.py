@@ -0,0 +1,91 @@
+from collections import deque
+from threading import Lock
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class LatencyTracker:
+    """
+    Records the latencies of the waits of the drivers, by key (typically the state and the selector waited for), and
+    derives the timeout of the next waits from the observed percentiles.
+    """
+
+    def __init__(self, percentile: float = 0.95, margin: float = 2.0, min_samples: int = 20,
+                 optional_timeout: float = 1.0, floor: float = 0.5, max_samples: int = 500):
+        """
+        Constructor of the LatencyTracker class.
+
+        :param percentile: The percentile of the observed latencies used to derive the timeouts.
+        :param margin: The factor applied to the percentile for the waits of required elements.
+        :param min_samples: The number of samples needed before a timeout is derived from the latencies.
+        :param optional_timeout: The timeout of the waits of optional elements until enough samples are recorded.
+        :param floor: The minimum timeout derived from the latencies, in seconds.
+        :param max_samples: The number of latest samples kept by key.
+        """
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.optional_timeout = optional_timeout
+        self.floor = floor
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = Lock()
+
+    def record(self, key: str, latency: float) -> None:
+        """
+        Records the latency of a successful wait.
+
+        :param key: The key of the wait.
+        :param latency: The time it took, in seconds.
+        """
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.max_samples)).append(latency)
+
+    def observed(self, key: str) -> Optional[float]:
+        """
+        Returns the configured percentile of the latencies recorded for a key.
+
+        :param key: The key of the wait.
+        :return: The percentile, None if not enough samples were recorded.
+        """
+        with self._lock:
+            samples = list(self._samples.get(key, []))
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.quantile(samples, self.percentile))
+
+    def timeout(self, key: str, ceiling: float, optional: bool = False) -> float:
+        """
+        Returns the timeout to use for a wait.
+        Waits of required elements get the ceiling until enough samples are recorded, then a margin over the
+        observed percentile. Waits of optional elements get the observed percentile so that they fail fast.
+
+        :param key: The key of the wait.
+        :param ceiling: The maximum timeout, in seconds.
+        :param optional: Is the element waited for optional?
+        :return: The timeout, in seconds.
+        """
+        observed = self.observed(key)
+        if observed is None:
+            return min(self.optional_timeout, ceiling) if optional else ceiling
+        if not optional:
+            observed *= self.margin
+        return min(ceiling, max(self.floor, observed))
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Returns the count, median and percentile of the latencies recorded for every key.
+
+        :return: The statistics by key.
+        """
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+        return {
+            key: {
+                'count': len(values),
+                'median': float(np.median(values)),
+                'percentile': float(np.quantile(values, self.percentile))
+            }
+            for key, values in samples.items() if values
+        }
@@ -1,25 +1,159 @@
-from typing import Optional, List, Callable, Union, Any
+import json
+import time
+from contextlib import contextmanager
+from typing import Optional, List, Callable, Union, Any, Dict
 
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, \
-    ElementClickInterceptedException, TimeoutException
+    ElementClickInterceptedException, TimeoutException, WebDriverException
 from selenium.webdriver import Firefox
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
+from logzero import logger
 
 from scrapers.utils.custom_error_handling import custom_error_handling
+from scrapers.utils.field_selector import FieldSelector
+from scrapers.utils.latency_tracker import LatencyTracker
+
+# Reads fields of the page. Every field is [css, attribute, many], a field is null when its single element is missing
+# and the fields whose extraction failed are listed in `__errors__`.
+# If a container selector is given (arguments[1]), the fields are read inside the closest ancestor of every container
+# matching arguments[2] (its parent if there is none) and a list with one object per container is returned instead.
+EXTRACT_FIELDS_SCRIPT = """
+const [fields, containerCss, scopeCss] = arguments;
+const read = (elm, attribute) => {
+    if (attribute === 'text') {
+        return (elm.innerText || '').trim();
+    }
+    const value = elm[attribute] !== undefined ? elm[attribute] : elm.getAttribute(attribute);
+    return value === undefined ? null : value;
+};
+const extract = (root) => {
+    const result = {__errors__: []};
+    for (const [name, [css, attribute, many]] of Object.entries(fields)) {
+        try {
+            if (many) {
+                result[name] = Array.from(root.querySelectorAll(css))
+                    .map(elm => read(elm, attribute))
+                    .filter(value => value);
+            } else {
+                const elm = root.querySelector(css);
+                result[name] = elm === null ? null : read(elm, attribute);
+            }
+        } catch (e) {
+            result.__errors__.push(name);
+        }
+    }
+    return result;
+};
+if (!containerCss) {
+    return JSON.stringify(extract(document));
+}
+return JSON.stringify(Array.from(document.querySelectorAll(containerCss)).map(
+    container => extract((scopeCss && container.closest(scopeCss)) || container.parentElement)
+));
+"""
+
+# Waits until the element matching arguments[0] is in the state arguments[1], for at most arguments[2] milliseconds.
+# The condition is checked on every DOM mutation instead of polling, the callback receives whether it holds.
+# The 'changed' state holds once the element recorded by SNAPSHOT_SCRIPT is detached from the page or its text changed.
+WAIT_FOR_SELECTOR_SCRIPT = """
+const [css, state, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const isVisible = elm => elm.getClientRects().length > 0 && getComputedStyle(elm).visibility !== 'hidden';
+const conditions = {
+    present: () => document.querySelector(css) !== null,
+    visible: () => {
+        const elm = document.querySelector(css);
+        return elm !== null && isVisible(elm);
+    },
+    clickable: () => {
+        const elm = document.querySelector(css);
+        return elm !== null && isVisible(elm) && !elm.disabled;
+    },
+    changed: () => {
+        const snapshot = window.__maWaitSnapshot;
+        if (!snapshot || snapshot.css !== css) {
+            return document.querySelector(css) !== null;
+        }
+        return !snapshot.elm.isConnected || snapshot.elm.innerText !== snapshot.text;
+    },
+};
+const condition = conditions[state];
+if (condition()) {
+    done(true);
+    return;
+}
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (condition()) {
+        finish(true);
+    }
+});
+const finish = result => {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(result);
+};
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+timer = setTimeout(() => finish(condition()), timeoutMs);
+"""
+
+# Records the first element matching arguments[0] and its text, for the 'changed' state of WAIT_FOR_SELECTOR_SCRIPT.
+SNAPSHOT_SCRIPT = """
+const elm = document.querySelector(arguments[0]);
+window.__maWaitSnapshot = elm === null ? null : {css: arguments[0], elm: elm, text: elm.innerText};
+"""
+
+# States of WAIT_FOR_SELECTOR_SCRIPT matching the selenium expected conditions.
+WAIT_STATES = {
+    ec.presence_of_element_located: 'present',
+    ec.visibility_of_element_located: 'visible',
+    ec.element_to_be_clickable: 'clickable',
+}
 
 
 class MADriver(Firefox):
 
-    def __init__(self, firefox_options=None, timeout: int = 5):
+    # Margin (in seconds) of the script timeout over the waits, the wait scripts stop by themselves before it.
+    SCRIPT_TIMEOUT_MARGIN = 5
+
+    def __init__(self, firefox_options=None, timeout: int = 5, latencies: LatencyTracker = None):
         super().__init__(firefox_options=firefox_options)
+        self.latencies = latencies or LatencyTracker()
+        self.page_loads = 0
+        # Number of times the driver was checked for recycling by its DriverManager.
+        self.recycling_checks = 0
+        # Settings the driver was built with, set by DriverFactory.
+        self.headless = None
+        self.profile = None
+        self.set_timeout(timeout)
+
+    def set_timeout(self, timeout: int) -> None:
+        """
+        Sets the timeout of the waits of the driver.
+
+        :param timeout: The timeout in seconds.
+        """
         self.timeout = timeout
+        self.set_script_timeout(timeout + MADriver.SCRIPT_TIMEOUT_MARGIN)
 
     def get(self, url: str):
+        self.page_loads += 1
         super().get(url=url)
 
+    def is_alive(self) -> bool:
+        """
+        Checks that the browser still responds.
+
+        :return: True if the browser responds, False otherwise.
+        """
+        try:
+            return self.execute_script('return 1;') == 1
+        except WebDriverException:
+            return False
+
     @custom_error_handling((NoSuchElementException, StaleElementReferenceException))
     def get_text(self, css_string: str, lambda_transform: Callable = None) -> str:
         """
@@ -47,11 +181,9 @@ class MADriver(Firefox):
         def dummy_lambda(x):
             return x
         lambda_transform = lambda_transform or dummy_lambda
-        return [
-            lambda_transform(elm.text)
-            for elm in self.find_elements_by_css_selector(css_string)
-            if elm.text
-        ]
+        # Reading the text only once per element, every read is a call to the browser.
+        texts = [elm.text for elm in self.find_elements_by_css_selector(css_string)]
+        return [lambda_transform(text) for text in texts if text]
 
     @custom_error_handling((NoSuchElementException, StaleElementReferenceException))
     def get_href(self, css_string: str) -> str:
@@ -72,11 +204,105 @@ class MADriver(Firefox):
         :return: The list of links extracted from the elements.
         """
 
-        return [
-            elm.get_attribute('href')
-            for elm in self.find_elements_by_css_selector(css_string)
-            if elm.get_attribute('href')
-        ]
+        hrefs = [elm.get_attribute('href') for elm in self.find_elements_by_css_selector(css_string)]
+        return [href for href in hrefs if href]
+
+    def extract(self, fields: Dict[str, FieldSelector]) -> Dict[str, Any]:
+        """
+        Extracts all the fields of the page in a single call to the browser.
+        Fields that could not be read by the script are extracted one by one with `extract_field`.
+
+        :param fields: The fields to extract, by name.
+        :return: The extracted values, by name.
+        """
+        try:
+            values = json.loads(self.execute_script(
+                EXTRACT_FIELDS_SCRIPT,
+                MADriver.fields_to_script_argument(fields),
+                None,
+                None
+            ))
+        except (WebDriverException, TypeError, ValueError):
+            values = {'__errors__': list(fields)}
+        errors = set(values.pop('__errors__', []))
+        content = {}
+        for name, field in fields.items():
+            if name in errors or name not in values:
+                content[name] = self.extract_field(field)
+            else:
+                content[name] = MADriver.transform_value(field, values[name])
+        return content
+
+    def extract_list(self, container_css: str, fields: Dict[str, FieldSelector],
+                     scope_css: str = None) -> List[Dict[str, Any]]:
+        """
+        Extracts the fields of every element matching `container_css` in a single call to the browser.
+        The selectors of the fields are relative to the closest ancestor of the container matching `scope_css`, or to
+        the parent of the container. Missing or unreadable fields are set to None.
+
+        :param container_css: The CSS selector of the containers (e.g. one per paper of a result list).
+        :param fields: The fields to extract in each container, by name.
+        :param scope_css: The CSS selector of the ancestor of the container in which fields are searched.
+        :return: A list with the extracted values of each container, in the order of the page.
+        """
+        records = json.loads(self.execute_script(
+            EXTRACT_FIELDS_SCRIPT,
+            MADriver.fields_to_script_argument(fields),
+            container_css,
+            scope_css
+        ))
+        content = []
+        for values in records:
+            errors = set(values.pop('__errors__', []))
+            content.append({
+                name: MADriver.transform_value(field._replace(optional=True), values.get(name))
+                if name not in errors else None
+                for name, field in fields.items()
+            })
+        return content
+
+    @staticmethod
+    def fields_to_script_argument(fields: Dict[str, FieldSelector]) -> Dict[str, list]:
+        """
+        Converts the fields to the argument expected by the extraction script.
+
+        :param fields: The fields, by name.
+        :return: The fields as [css, attribute, many], by name.
+        """
+        return {name: [field.css, field.attribute, field.many] for name, field in fields.items()}
+
+    @staticmethod
+    def transform_value(field: FieldSelector, value: Any) -> Any:
+        """
+        Applies the transformation of a field to a value read on the page.
+
+        :param field: The field.
+        :param value: The raw value, a list if the field has several elements.
+        :return: The transformed value.
+        """
+        if value is None:
+            if not field.optional and not field.many:
+                raise NoSuchElementException(f'Unable to locate element: {field.css}')
+            return None
+        if field.transform is None:
+            return value
+        if field.many:
+            return [field.transform(elm) for elm in value]
+        return field.transform(value)
+
+    def extract_field(self, field: FieldSelector) -> Any:
+        """
+        Extracts a single field with one call per element.
+
+        :param field: The field to extract.
+        :return: The extracted value.
+        """
+        if field.attribute == 'text':
+            getter = self.get_text_list if field.many else self.get_text
+            return getter(css_string=field.css, lambda_transform=field.transform, ignore_exceptions=field.optional)
+        getter = self.get_href_list if field.many else self.get_href
+        value = getter(css_string=field.css, ignore_exceptions=field.optional)
+        return MADriver.transform_value(field, value) if value is not None else None
 
     @custom_error_handling(
         (NoSuchElementException, ElementClickInterceptedException, StaleElementReferenceException),
@@ -105,7 +331,54 @@ class MADriver(Firefox):
         :param css_class: The class (Not the css selector) to wait for.
         :return: None
         """
-        WebDriverWait(self, self.timeout).until(func((By.CLASS_NAME, css_class)))
+        state = WAIT_STATES.get(func)
+        if state is None:
+            # No event based equivalent, polling.
+            WebDriverWait(self, self.timeout, poll_frequency=0.1).until(func((By.CLASS_NAME, css_class)))
+        elif not self.wait_for_selector(css_selector=f'.{css_class}', state=state):
+            raise TimeoutException(f'Timed out waiting for the class {css_class} to be {state}.')
+
+    def wait_for_selector(self, css_selector: str, state: str = 'visible', timeout: float = None,
+                          optional: bool = False) -> bool:
+        """
+        Waits for an element to be in a given state. The page notifies the driver as soon as the state is reached
+        (through a MutationObserver), there is no polling interval.
+        Unless given, the timeout is derived from the latencies previously observed for the same wait, the timeout of
+        the driver being the ceiling.
+
+        :param css_selector: The CSS selector of the element.
+        :param state: 'present', 'visible', 'clickable' or 'changed' (see `waiting_for_change`).
+        :param timeout: The maximum time to wait in seconds, capped by the timeout of the driver.
+        :param optional: Is the element optional? Waits for optional elements fail fast.
+        :return: True if the state was reached, False if the wait timed out.
+        """
+        key = f'{state}:{css_selector}'
+        if timeout is None:
+            timeout = self.latencies.timeout(key=key, ceiling=self.timeout, optional=optional)
+        timeout = min(timeout, self.timeout)
+        start = time.perf_counter()
+        reached = bool(self.execute_async_script(WAIT_FOR_SELECTOR_SCRIPT, css_selector, state, int(timeout * 1000)))
+        if reached:
+            self.latencies.record(key=key, latency=time.perf_counter() - start)
+        return reached
+
+    @contextmanager
+    def waiting_for_change(self, css_selector: str, timeout: float = None):
+        """
+        Context manager waiting, on exit, for the element matching `css_selector` when entering to be replaced or
+        to have its text changed. Used around an action that reloads part of the page, e.g. :
+
+            with driver.waiting_for_change('div.primary_paper'):
+                button.click()
+
+        :param css_selector: The CSS selector of the element expected to change.
+        :param timeout: The maximum time to wait in seconds.
+        :return: None
+        """
+        self.execute_script(SNAPSHOT_SCRIPT, css_selector)
+        yield
+        if not self.wait_for_selector(css_selector=css_selector, state='changed', timeout=timeout):
+            logger.warning(f'No change of {css_selector} detected.')
 
     def wait_for_papers_to_load(self) -> None:
         """
@@ -143,5 +416,7 @@ class MADriver(Firefox):
 
     def go_to_next_page(self, next_page_element: WebElement) -> None:
         if next_page_element is not None:
-            next_page_element.click()
+            # Waiting for the papers of the current page to be replaced, not only for papers to be visible.
+            with self.waiting_for_change(css_selector='div.primary_paper'):
+                next_page_element.click()
             self.wait_for_papers_to_load()
@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from threading import Lock, get_ident
+from typing import Optional, Iterator
+
+from logzero import logger
+
+
+class PageCache:
+    """
+    On-disk cache of the pages of the papers, keyed by URL.
+    Every entry is a gzip compressed JSON file holding the fields extracted from the page and, optionally, the rendered
+    HTML. Entries expire after `ttl_days` and the oldest entries are evicted once the cache grows over `max_size_mb`.
+    """
+
+    def __init__(self, directory: str = 'page_cache', ttl_days: float = 30, max_size_mb: float = 2048,
+                 store_html: bool = False):
+        """
+        Constructor of the PageCache class.
+
+        :param directory: The directory of the cache.
+        :param ttl_days: The time after which an entry expires, in days. None for no expiry.
+        :param max_size_mb: The maximum size of the cache, in MB. None for no limit, e.g. in the worker processes of a
+        crawl, the eviction being left to the parent process.
+        :param store_html: Should the rendered HTML of the pages be stored along with the fields?
+        """
+        self.directory = directory
+        self.ttl = ttl_days * 86400 if ttl_days is not None else None
+        self.max_size = max_size_mb * 2 ** 20 if max_size_mb is not None else None
+        self.store_html = store_html
+        self._lock = Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        # The size is only needed for the eviction, the whole cache is scanned to compute it.
+        self._size = 0
+        if self.max_size is not None:
+            self.rescan()
+
+    def rescan(self) -> None:
+        """
+        Recomputes the size of the cache, e.g. after entries were added by other processes.
+        """
+        size = 0
+        for path in self.paths():
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._size = size
+
+    def path(self, url: str) -> str:
+        """
+        Returns the path of the entry of a URL.
+
+        :param url: The URL of the page.
+        :return: The path of the entry.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], f'{key}.json.gz')
+
+    def paths(self) -> Iterator[str]:
+        """
+        Iterates over the paths of all the entries of the cache.
+        """
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if file.endswith('.json.gz'):
+                    yield os.path.join(root, file)
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the entry of a URL if it is in the cache and has not expired.
+
+        :param url: The URL of the page.
+        :return: The entry, with the keys 'url', 'fetched_at', 'fields', 'html' and 'metadata', None if there is none.
+        """
+        path = self.path(url)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                self.remove(path)
+                return None
+            return PageCache.read(path)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def read(path: str) -> dict:
+        """
+        Reads an entry.
+
+        :param path: The path of the entry.
+        :return: The entry.
+        """
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return json.load(file)
+
+    def put(self, url: str, fields: dict, html: str = None, metadata: dict = None) -> None:
+        """
+        Adds the fields extracted from a page to the cache.
+
+        :param url: The URL of the page.
+        :param fields: The fields extracted from the page, they must be JSON serializable.
+        :param html: The rendered HTML of the page, only stored if `store_html` is True.
+        :param metadata: Context of the crawl needed to rebuild the record of the page (e.g. the search string).
+        """
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'url': url,
+            'fetched_at': time.time(),
+            'fields': fields,
+            'html': html if self.store_html else None,
+            'metadata': metadata or {}
+        }
+        # Written to a temporary file first, so that a reader never sees a partial entry.
+        tmp_path = f'{path}.{os.getpid()}.{get_ident()}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+            json.dump(entry, file)
+        with self._lock:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path) - previous_size
+        self.evict()
+
+    def remove(self, path: str) -> None:
+        """
+        Removes an entry.
+
+        :param path: The path of the entry.
+        """
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        """
+        Removes the oldest entries until the cache is back to 90% of its maximum size.
+        """
+        if self.max_size is None:
+            return
+        with self._lock:
+            if self._size <= self.max_size:
+                return
+        # The entries may be removed by other threads (e.g. when they expire) while they are listed.
+        entries = sorted(
+            (mtime, path) for mtime, path in ((PageCache.get_mtime(path), path) for path in self.paths())
+            if mtime is not None
+        )
+        evicted = 0
+        for _, path in entries:
+            with self._lock:
+                if self._size <= 0.9 * self.max_size:
+                    break
+            self.remove(path)
+            evicted += 1
+        logger.info(f'Evicted {evicted} page(s) from the cache.')
+
+    @staticmethod
+    def get_mtime(path: str) -> Optional[float]:
+        """
+        Returns the time of the last modification of an entry.
+
+        :param path: The path of the entry.
+        :return: The time, None if the entry no longer exists.
+        """
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
@@ -0,0 +1,214 @@
+import os
+from datetime import datetime
+from threading import Lock
+from typing import List, Tuple, Iterable
+from urllib.parse import quote
+
+import pandas as pd
+from logzero import logger
+
+from models.title_dedup_index import TitleDedupIndex
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class PaperExporter:
+    """
+    Exports the papers scraped during a crawl, batch after batch, to files partitioned by search string and crawl date
+    (`<directory>/search_string=<...>/crawl_date=<...>/part-<...>`, readable as a hive partitioned dataset).
+
+    In the Parquet and Arrow IPC formats, every batch is appended to the open file of its partition as a record batch,
+    the tags and authors are list columns. The csv format needs no extra dependency, the lists are joined with commas.
+    A paper is only exported once per exporter, its title variants and near-duplicates are skipped.
+    """
+
+    FORMATS = {'parquet': 'parquet', 'arrow': 'arrow', 'csv': 'csv'}
+    PARTITION_KEYS = ['search_string', 'crawl_date']
+    LIST_COLUMNS = ['tags', 'authors']
+
+    def __init__(self, directory: str = 'exports', format: str = 'parquet', partition_by: List[str] = None,
+                 compression: str = 'zstd', file_name: str = None):
+        """
+        Constructor of the PaperExporter class.
+
+        :param directory: The root directory of the export.
+        :param format: 'parquet', 'arrow' (Arrow IPC file) or 'csv'. Parquet and Arrow need pyarrow.
+        :param partition_by: The partition keys, among `PARTITION_KEYS`. Defaults to all of them, [] for a single file.
+        :param compression: The compression codec of the Parquet and Arrow files, None to disable it.
+        :param file_name: The name of the files, defaults to a name unique to the exporter.
+        """
+        if format not in PaperExporter.FORMATS:
+            raise ValueError(f'Unknown export format {format}, available formats : {list(PaperExporter.FORMATS)}.')
+        if format != 'csv' and pa is None:
+            raise ImportError(f'pyarrow is required to export to {format}, install it or use the csv format.')
+        partition_by = PaperExporter.PARTITION_KEYS if partition_by is None else partition_by
+        unknown = [key for key in partition_by if key not in PaperExporter.PARTITION_KEYS]
+        if unknown:
+            raise ValueError(f'Unknown partition keys {unknown}, available keys : {PaperExporter.PARTITION_KEYS}.')
+        self.directory = directory
+        self.format = format
+        self.partition_by = partition_by
+        self.compression = compression
+        self.file_name = file_name or \
+            f'part-{datetime.now().strftime("%Y%m%d%H%M%S")}-{os.getpid()}.{PaperExporter.FORMATS[format]}'
+        self.export_count = 0
+        # Writers of the Parquet and Arrow files (None for the csv files), by path, they stay open until the exporter is
+        # closed.
+        self._writers = {}
+        self._sinks = {}
+        self._titles = TitleDedupIndex()
+        self._lock = Lock()
+
+    @property
+    def schema(self):
+        """
+        Returns the Arrow schema of the exported files, the partition keys are only in the paths of the files.
+        """
+        return pa.schema([field for field in pa.schema([
+            ('title', pa.string()),
+            ('publication_date', pa.date32()),
+            ('source', pa.string()),
+            ('doi', pa.string()),
+            ('abstract', pa.string()),
+            ('url', pa.string()),
+            ('page_url', pa.string()),
+            ('citation_count', pa.int64()),
+            ('tags', pa.list_(pa.string())),
+            ('authors', pa.list_(pa.string())),
+            ('search_string', pa.string()),
+            ('crawled_at', pa.timestamp('s')),
+        ]) if field.name not in self.partition_by])
+
+    def write(self, papers: List[dict]) -> int:
+        """
+        Appends a batch of papers to the files of their partitions.
+
+        :param papers: The papers, as formatted for the DB. The papers that were only seen in a list of results are
+        skipped.
+        :return: The number of papers exported.
+        """
+        now = datetime.now().replace(microsecond=0)
+        partitions = {}
+        with self._lock:
+            for paper in papers:
+                if not paper or paper.get('known') or self._titles.find(paper.get('title')) is not None:
+                    continue
+                self._titles.add(paper_id=paper['title'], title=paper['title'])
+                row = PaperExporter.to_row(paper=paper, crawled_at=now)
+                partitions.setdefault(self.partition(row), []).append(row)
+            for partition, rows in partitions.items():
+                self.write_partition(partition=partition, rows=rows)
+                self.export_count += len(rows)
+        return sum(len(rows) for rows in partitions.values())
+
+    @staticmethod
+    def to_row(paper: dict, crawled_at: datetime) -> dict:
+        """
+        Builds the exported row of a paper.
+
+        :param paper: The paper.
+        :param crawled_at: The time of the crawl.
+        :return: The row, the tags and authors being lists.
+        """
+        publication_date = paper.get('publication_date')
+        search_string = paper.get('search_string')
+        return {
+            'title': paper.get('title'),
+            'publication_date': publication_date.date() if isinstance(publication_date, datetime) else publication_date,
+            'source': paper.get('source'),
+            'doi': paper.get('doi'),
+            'abstract': paper.get('abstract'),
+            'url': paper.get('url'),
+            'page_url': paper.get('page_url'),
+            'citation_count': paper.get('citation_count'),
+            'tags': list(paper.get('tags') or []),
+            'authors': list(paper.get('authors') or []),
+            'search_string': search_string.get('name') if isinstance(search_string, dict) else search_string,
+            'crawled_at': crawled_at,
+        }
+
+    def partition(self, row: dict) -> Tuple[Tuple[str, str], ...]:
+        """
+        Returns the partition of a row.
+
+        :param row: The exported row.
+        :return: The (key, value) pairs of the partition.
+        """
+        values = {'search_string': row['search_string'] or '', 'crawl_date': row['crawled_at'].date().isoformat()}
+        return tuple((key, values[key]) for key in self.partition_by)
+
+    def path(self, partition: Iterable[Tuple[str, str]]) -> str:
+        """
+        Returns the path of the file of a partition, the values are URI encoded in the directory names.
+
+        :param partition: The (key, value) pairs of the partition.
+        :return: The path.
+        """
+        directories = [f'{key}={quote(value, safe="")}' for key, value in partition]
+        return os.path.join(self.directory, *directories, self.file_name)
+
+    def write_partition(self, partition: Tuple[Tuple[str, str], ...], rows: List[dict]) -> None:
+        """
+        Appends rows to the file of their partition, the file is created by the first rows.
+
+        :param partition: The partition.
+        :param rows: The rows.
+        """
+        path = self.path(partition)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.format == 'csv':
+            df = pd.DataFrame(rows)
+            for column in PaperExporter.LIST_COLUMNS:
+                df[column] = df[column].map(','.join)
+            # The file is overwritten by the first rows of the exporter.
+            created = path in self._writers
+            df.to_csv(path_or_buf=path, mode='a' if created else 'w', header=not created, index=False)
+            self._writers[path] = None
+            return
+        schema = self.schema
+        table = pa.Table.from_pylist([{key: row[key] for key in schema.names} for row in rows], schema=schema)
+        writer = self._writers.get(path)
+        if writer is None:
+            if self.format == 'parquet':
+                writer = pq.ParquetWriter(path, schema=schema, compression=self.compression or 'none')
+            else:
+                self._sinks[path] = pa.OSFile(path, 'wb')
+                options = pa.ipc.IpcWriteOptions(compression=self.compression)
+                writer = pa.ipc.new_file(self._sinks[path], schema=schema, options=options)
+            self._writers[path] = writer
+        writer.write_table(table)
+
+    def close(self) -> None:
+        """
+        Closes the files of the partitions, the Parquet and Arrow files are only readable once closed.
+        """
+        with self._lock:
+            for writer in self._writers.values():
+                if writer is not None:
+                    writer.close()
+            for sink in self._sinks.values():
+                sink.close()
+            self._writers, self._sinks = {}, {}
+        if self.export_count:
+            logger.info(f'{self.export_count} paper(s) exported to {self.directory}.')
+
+    @staticmethod
+    def read(directory: str) -> pd.DataFrame:
+        """
+        Loads an export in a DataFrame, with the partition keys as columns.
+
+        :param directory: The root directory of the export.
+        :return: The papers.
+        """
+        import pyarrow.dataset as ds
+        file_format = 'parquet'
+        for _, _, files in os.walk(directory):
+            if any(file.endswith('.arrow') for file in files):
+                file_format = 'ipc'
+                break
+        return ds.dataset(directory, format=file_format, partitioning='hive').to_table().to_pandas()
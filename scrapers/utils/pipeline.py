@@ -0,0 +1,149 @@
+import queue
+import traceback
+from threading import Thread
+from typing import Callable, List, Optional, Any
+
+from logzero import logger
+
+from scrapers.utils.driver_pool import DriverPool
+from scrapers.utils.ma_driver import MADriver
+
+# Marks the end of a queue.
+_END = None
+
+
+class PaperPipeline:
+    """
+    Producer/consumer pipeline of a crawl, every stage is connected to the next one by a bounded queue so that the
+    memory used does not depend on the size of the crawl:
+
+    - the spider (list crawling) puts the links of the papers with `put_link`, blocking while the queue is full,
+    - one detail worker per driver of the pool parses the pages of the papers into records,
+    - a single writer thread gathers the records in batches and hands them to `writer` (DB insertion, exports...).
+
+    A pipeline without pool only has the writer stage, it is fed with `put_record` or through its records queue, e.g.
+    by the pipelines of worker processes. A pipeline without writer sends its records to its records queue, to be
+    consumed by another pipeline.
+    """
+
+    def __init__(self, pool: DriverPool = None, parse_link: Callable[[MADriver, Any], Optional[List[dict]]] = None,
+                 writer: Callable[[List[dict]], int] = None, records: Any = None, queue_size: int = 100,
+                 batch_size: int = 100, flush_interval: float = 5):
+        """
+        Constructor of the PaperPipeline class.
+
+        :param pool: The drivers of the detail workers.
+        :param parse_link: The function parsing a link with a driver into a list of records.
+        :param writer: The function writing a batch of records, returns the number of papers inserted.
+        :param records: The queue of the records, a bounded queue is created if not provided.
+        :param queue_size: The maximum number of elements waiting in each queue.
+        :param batch_size: The number of records written at once.
+        :param flush_interval: The time (in seconds) after which an incomplete batch is written when no record comes.
+        """
+        self.pool = pool
+        self.parse_link = parse_link
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.links = queue.Queue(maxsize=queue_size)
+        self.records = records if records is not None else queue.Queue(maxsize=queue_size)
+        self.insert_count = 0
+        self._detail_workers = []
+        self._writer_thread = None
+
+    def start(self) -> 'PaperPipeline':
+        """
+        Starts the detail workers and the writer.
+
+        :return: The pipeline.
+        """
+        if self.pool is not None:
+            self._detail_workers = [
+                Thread(target=self._parse_links, name=f'detail-worker-{i}', daemon=True)
+                for i in range(self.pool.size)
+            ]
+        if self.writer is not None:
+            self._writer_thread = Thread(target=self._write_records, name='writer', daemon=True)
+            self._writer_thread.start()
+        for worker in self._detail_workers:
+            worker.start()
+        return self
+
+    def put_link(self, link: Any) -> None:
+        """
+        Queues a link to be parsed by a detail worker, blocks while the queue is full.
+
+        :param link: The link, passed to `parse_link`.
+        """
+        self.links.put(link)
+
+    def put_record(self, record: dict) -> None:
+        """
+        Queues a record to be written, blocks while the queue is full.
+
+        :param record: The record.
+        """
+        self.records.put(record)
+
+    def close(self) -> int:
+        """
+        Waits for all the queued links to be parsed and all the records to be written, then stops the pipeline.
+
+        :return: The number of papers inserted by the writer.
+        """
+        for _ in self._detail_workers:
+            self.links.put(_END)
+        for worker in self._detail_workers:
+            worker.join()
+        self._detail_workers = []
+        if self._writer_thread is not None:
+            self.records.put(_END)
+            self._writer_thread.join()
+            self._writer_thread = None
+        return self.insert_count
+
+    def _parse_links(self) -> None:
+        """
+        Loop of a detail worker.
+        """
+        while True:
+            link = self.links.get()
+            if link is _END:
+                return
+            try:
+                with self.pool.driver() as driver:
+                    records = self.parse_link(driver, link) or []
+            except Exception:
+                # A failing page must not stop the worker, the producer would wait forever.
+                logger.warning(f'Failed to parse {link}:\n{traceback.format_exc()}')
+                continue
+            for record in records:
+                self.records.put(record)
+
+    def _write_records(self) -> None:
+        """
+        Loop of the writer.
+        """
+        batch = []
+        while True:
+            try:
+                record = self.records.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+                if not batch:
+                    continue
+            else:
+                if record is _END:
+                    break
+                batch.append(record)
+            if batch and (len(batch) >= self.batch_size or record is None):
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[dict]) -> None:
+        try:
+            self.insert_count += self.writer(batch)
+        except Exception:
+            logger.error(f'Failed to write a batch of {len(batch)} record(s):\n{traceback.format_exc()}')
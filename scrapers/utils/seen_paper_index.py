@@ -0,0 +1,204 @@
+import hashlib
+import math
+import os
+import re
+from threading import Lock
+from typing import Optional, Iterable
+
+from logzero import logger
+
+import models.base as base
+from models.papers.paper import Paper
+
+
+class BloomFilter:
+    """
+    Probabilistic set: a key that was added is always found, a key that was not added is found with a probability
+    of about `error_rate`.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01):
+        """
+        Constructor of the BloomFilter class.
+
+        :param capacity: The number of keys the filter is sized for.
+        :param error_rate: The false positive rate expected at full capacity.
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.nb_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        """
+        Returns the positions of the bits of a key (double hashing).
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.nb_hashes))
+
+    def add(self, key: str) -> None:
+        """
+        Adds a key to the filter.
+        """
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Checks if a key may have been added to the filter.
+        """
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenPaperIndex:
+    """
+    Index of the papers already scraped, checked before visiting the page of a paper.
+
+    The links, DOIs and titles of the papers committed by the spiders are kept in memory and in an append-only file
+    (written by `flush`), loaded at start. The links, titles and DOIs of the papers of the database are loaded in a
+    Bloom filter, only the (rare) keys matching the filter are checked against the database. The papers queued but not
+    committed yet are only kept in memory for the current run (`queue`), so that a paper whose insertion fails is
+    scraped again by the next runs.
+    """
+
+    def __init__(self, path: str, error_rate: float = 0.001):
+        """
+        Constructor of the SeenPaperIndex class.
+
+        :param path: The path of the file of the index.
+        :param error_rate: The false positive rate of the Bloom filter of the database papers.
+        """
+        self.path = path
+        self.error_rate = error_rate
+        self._keys = set()
+        self._pending = []
+        self._queued = set()
+        self._db_keys = BloomFilter()
+        self._lock = Lock()
+
+    @staticmethod
+    def normalize_title(title: str) -> str:
+        """
+        Normalizes a title so that case and spacing variants share the same key.
+
+        :param title: The title.
+        :return: The normalized title.
+        """
+        return re.sub(r'\s+', ' ', title).strip().lower()
+
+    @staticmethod
+    def get_keys(link: str = None, title: str = None, doi: str = None) -> list:
+        """
+        Returns the keys identifying a paper.
+
+        :param link: The link to the page of the paper.
+        :param title: The title of the paper.
+        :param doi: The DOI of the paper.
+        :return: The keys.
+        """
+        keys = []
+        if link:
+            keys.append(f'url:{link}')
+        if doi:
+            keys.append(f'doi:{doi.strip().lower()}')
+        if title:
+            keys.append(f'title:{SeenPaperIndex.normalize_title(title)}')
+        return keys
+
+    def load(self) -> 'SeenPaperIndex':
+        """
+        Loads the keys of the file and of the papers of the database.
+
+        :return: The index.
+        """
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as file:
+                self._keys = {line.rstrip('\n') for line in file if line.strip()}
+        session = base.get_session()
+        try:
+            nb_papers = session.query(Paper.id).count()
+            self._db_keys = BloomFilter(capacity=max(100000, 2 * nb_papers), error_rate=self.error_rate)
+            for link, title, doi in session.query(Paper.page_url, Paper.title, Paper.doi).yield_per(10000):
+                for key in SeenPaperIndex.get_keys(link=link, title=title, doi=doi):
+                    self._db_keys.add(key)
+        finally:
+            session.close()
+        logger.info(f'Seen paper index loaded: {len(self._keys)} scraped keys, {nb_papers} papers in the database.')
+        return self
+
+    def contains(self, link: str = None, title: str = None, doi: str = None) -> bool:
+        """
+        Checks whether a paper was already scraped or is in the database.
+
+        :param link: The link to the page of the paper.
+        :param title: The title of the paper.
+        :param doi: The DOI of the paper.
+        :return: True if the paper is known.
+        """
+        keys = SeenPaperIndex.get_keys(link=link, title=title, doi=doi)
+        with self._lock:
+            if any(key in self._keys or key in self._queued for key in keys):
+                return True
+        if not any(key in self._db_keys for key in keys):
+            return False
+        # The Bloom filter may give false positives, confirming with the database.
+        return self.in_database(link=link, title=title, doi=doi)
+
+    @staticmethod
+    def in_database(link: Optional[str], title: Optional[str], doi: Optional[str]) -> bool:
+        """
+        Checks whether a paper is in the database.
+
+        :param link: The link to the page of the paper.
+        :param title: The title of the paper.
+        :param doi: The DOI of the paper.
+        :return: True if the paper is in the database.
+        """
+        session = base.get_session()
+        try:
+            return any(
+                Paper.row_exists(session=session, **{column: value})
+                for column, value in [('page_url', link), ('doi', doi), ('title', title)]
+                if value
+            )
+        finally:
+            session.close()
+
+    def queue(self, link: str = None, title: str = None, doi: str = None) -> None:
+        """
+        Marks a paper as queued for the current run, it is not visited again during the run but is not written to the
+        file.
+
+        :param link: The link to the page of the paper.
+        :param title: The title of the paper.
+        :param doi: The DOI of the paper.
+        """
+        with self._lock:
+            self._queued.update(SeenPaperIndex.get_keys(link=link, title=title, doi=doi))
+
+    def add(self, link: str = None, title: str = None, doi: str = None) -> None:
+        """
+        Adds a paper committed to the database to the index. It is written to the file on the next `flush`.
+
+        :param link: The link to the page of the paper.
+        :param title: The title of the paper.
+        :param doi: The DOI of the paper.
+        """
+        with self._lock:
+            new_keys = [key for key in SeenPaperIndex.get_keys(link=link, title=title, doi=doi) if key not in self._keys]
+            self._keys.update(new_keys)
+            self._pending += new_keys
+
+    def flush(self) -> None:
+        """
+        Appends the keys added since the last flush to the file of the index.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(''.join(f'{key}\n' for key in pending))
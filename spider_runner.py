@@ -1,8 +1,14 @@
+import argparse
 import os
+from sqlalchemy import text
+
 import models.base as base
 from models.db_session import DBSession
+from models.db_writer import DBWriter
 
 from scrapers.base_spiders.microsoft_academics import MicrosoftAcademicsSpider
+from scrapers.utils.driver_manager import DriverManager
+from scrapers.utils.citation_refresher import CitationRefresher
 
 from spiders_config import CONFIG
 from logzero import logger
@@ -14,9 +20,23 @@ class SpiderRunner:
       MicrosoftAcademicsSpider
     ]
 
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        """
+        Constructor of the SpiderRunner class.
+
+        :param resume: Should the spiders resume their last unfinished run? The DB is then kept as is.
+        """
         self.spiders_config = CONFIG.get('spiders')
-        self.session = SpiderRunner.db_setup()
+        self.resume = resume
+        base.configure(**CONFIG.get('database', {}))
+        # Incremental runs keep the papers of the previous runs, only the new papers are inserted.
+        self.incremental = CONFIG.get('incremental', True)
+        self.session = SpiderRunner.db_setup(wipe=not (resume or self.incremental))
+        # Single writer of the DB shared by the spiders, None to let every spider write through its own session.
+        writer_config = CONFIG.get('db_writer')
+        self.db_writer = DBWriter(**writer_config).start() if writer_config else None
+        # Browsers are shared by all the spiders of the run.
+        self.driver_manager = DriverManager(**CONFIG.get('drivers', {}))
         self.logger = logger
         current_dir = os.path.dirname(os.path.abspath(__file__))
         if current_dir not in os.environ['PATH'].split(os.pathsep):
@@ -34,33 +54,70 @@ class SpiderRunner:
                 spider_config = self.spiders_config.get(spider.__name__)
                 if spider_config:
                     start = time()
-                    papers_inserted = spider(**{**spider_config, 'db_session': self.session}).run()
+                    papers_inserted = spider(**{
+                        **spider_config,
+                        'db_session': self.session,
+                        'driver_manager': self.driver_manager,
+                        'db_writer': self.db_writer,
+                        'resume': self.resume
+                    }).run()
                     self.logger.info(f'Inserted {papers_inserted} papers(s) for {spider.__name__}. in {time() - start}')
                     total_papers_inserted += papers_inserted
                 else:
                     raise KeyError(f'No config found for spider {spider.__name__} in config.')
+        self.driver_manager.quit_all()
         self.close_db()
         self.logger.info(f'Inserted {total_papers_inserted} papers in total.')
 
+    def refresh_citations(self):
+        """
+        Refreshes the citation counts of the stalest papers of the DB with the configuration provided in
+        `CONFIG['citation_refresh']`, instead of running the spiders.
+        """
+        start = time()
+        refreshed = CitationRefresher(
+            db_session=self.session,
+            driver_manager=self.driver_manager,
+            **CONFIG.get('citation_refresh', {})
+        ).run()
+        self.driver_manager.quit_all()
+        self.close_db()
+        self.logger.info(f'Refreshed the citation counts of {refreshed} paper(s) in {time() - start}.')
+
     @staticmethod
-    def db_setup():
+    def db_setup(wipe: bool = True):
         """
         Instantiates a db session object and does some pre-processing on the DB.
 
+        :param wipe: Should the content of the tables be deleted?
         :return: A session object.
         """
         session = base.get_session()
-        # TODO DELETE when we have a proper running system.
-        tables = base.get_tables().keys()
-        for table in tables:
-            session.execute(f"DELETE FROM {table};")
+        if wipe:
+            for table in base.get_tables().keys():
+                session.execute(text(f'DELETE FROM "{table}";'))
             session.commit()
         return DBSession(session)
 
     def close_db(self):
+        if self.db_writer is not None:
+            self.db_writer.close()
+            self.db_writer = None
         if self.session:
             self.session.session.close()
 
 
-sr = SpiderRunner()
-sr.run()
+if __name__ == '__main__':
+    # Guarded so that the worker processes of the spiders do not start a new run when importing the main module.
+    parser = argparse.ArgumentParser(description='Runs the spiders.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume the last unfinished run of the spiders from their crawl journal.')
+    parser.add_argument('--refresh-citations', action='store_true',
+                        help='Refresh the citation counts of the stalest papers instead of running the spiders.')
+    args = parser.parse_args()
+    # The DB is never wiped before its citation counts are refreshed.
+    sr = SpiderRunner(resume=args.resume or args.refresh_citations)
+    if args.refresh_citations:
+        sr.refresh_citations()
+    else:
+        sr.run()
@@ -1,4 +1,34 @@
 CONFIG = {
+    "database": {
+        "url": "sqlite:///papers.db",
+        "profile": "tuned_sqlite",
+        "pool_size": 5,
+        "max_overflow": 10
+    },
+    # Keep the papers of the previous runs, False wipes the DB at each start.
+    "incremental": True,
+    "db_writer": {
+        "mode": "process",
+        "batch_size": 500,
+        "flush_interval": 0.5,
+        "queue_size": 100
+    },
+    "citation_refresh": {
+        "budget": 200,
+        "min_age_days": 30,
+        "velocity_weight": 1,
+        "batch_size": 50,
+        "pool_size": 4,
+        "headless": True,
+        "timeout": 10,
+        "browser_profile": "scrape"
+    },
+    "drivers": {
+        "max_pages": 500,
+        "max_memory_mb": 1500,
+        "memory_check_interval": 10,
+        "max_startup_workers": 8
+    },
     "spiders": {
         "MicrosoftAcademicsSpider": {
             "page_limit": 2,
@@ -9,7 +39,35 @@ CONFIG = {
             "pub_year_filter": 2005,
             "csv_path": "csv_exports",
             "nb_keywords": 3,
-            "keyword_file": "keywords_en.csv"
+            "keyword_file": "keywords_en.csv",
+            "driver_pool_size": 4,
+            "query_processes": 1,
+            "adaptive_timeouts": {
+                "percentile": 0.95,
+                "margin": 2,
+                "min_samples": 20,
+                "optional_timeout": 1
+            },
+            "browser_profile": "scrape",
+            "seen_index_path": "seen_papers.txt",
+            "page_cache": {
+                "directory": "page_cache",
+                "ttl_days": 30,
+                "max_size_mb": 2048,
+                "store_html": True
+            },
+            "pipeline": {
+                "queue_size": 100,
+                "batch_size": 50,
+                "flush_interval": 5
+            },
+            "crawl_journal": "crawl_state.db",
+            "export": {
+                "directory": "exports/microsoft_academics",
+                "format": "parquet",
+                "partition_by": ["search_string", "crawl_date"],
+                "compression": "zstd"
+            }
         },
     }
 }